@@ -0,0 +1,237 @@
+# Benchmark harness for tableau.py
+# Run with: python bench_tableau.py [--repeat N] [--mode list] [--mode compact]
+#           python bench_tableau.py --sweep    time every expansion strategy and pick the fastest per family
+#
+# Regression tracking:
+#   python bench_tableau.py --save bench_baseline.json      record a baseline
+#   python bench_tableau.py --compare bench_baseline.json   exit with status 1 if a formula family got slower
+#                                                           to parse or solve
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# tableau.py runs its coursework driver on import, keep that output off our stdout
+with contextlib.redirect_stdout(io.StringIO()):
+    from tableau import STRATEGIES, Progress, parse, sat, theory
+
+# Formulas that need many beta splits or many gamma instances, on top of the ones in input.txt
+EXTRA_FORMULAS = [
+    '(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))',
+    '((((p\\/q)\\/r)\\/s)&(((~p&~q)&~r)&~s))',
+    '((p->q)&((q->r)&((r->s)&(p&~s))))',
+    '~' * 40 + '(p->p)',
+    '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))',
+    '(AxAy(P(x,y)->P(y,x))&(P(a,b)&~P(b,a)))',
+    '(AxEyP(x,y)&EzQ(z,z))',
+    '((P(a,b)\\/Q(a,b))&((P(b,c)\\/Q(b,c))&(Ax~P(x,x)&AxAy~Q(x,y))))',
+    '((p\\/((q\\/r)&((s\\/~s)&(p\\/q))))&(AxP(x,x)&Ex~P(x,x)))',
+    '((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))',
+    '((((ExP(x,x)&EyQ(y,y))\\/(EyQ(y,y)&ExP(x,x)))&((ExR(x,x)&EyS(y,y))\\/(EyS(y,y)&ExR(x,x))))'
+    '&AxAy(P(x,x)->~Q(y,y)))',
+    '~' * 40 + '(((p&q)&(r&s))&(((p&q)&(r&s))&~(~p\\/~(q&r))))',
+]
+
+MODES = {
+    'list': {},
+    'compact': {'compact': True},
+    'spill': {'frontier_limit': 2},
+    'pure': {'pure_literals': True},
+    'simplify': {'simplify': True},
+    'tabling': {'tabling': True},
+    'backjump': {'backjumping': True},
+    'relevance': {'relevance': True},
+    'checkpoint': {'checkpoint': os.path.join(tempfile.gettempdir(), 'bench_tableau.ckpt'), 'checkpoint_interval': 0},
+    'progress': {'progress': Progress(callback=lambda snapshot: None, interval=0)},
+    'symmetry': {'symmetry': True},
+    'linear': {'linear': True},
+}
+
+def load_corpus(path='input.txt'):
+    '''Formulas from the input file plus EXTRA_FORMULAS, paired with their family'''
+    with open(path) as f:
+        lines = f.read().split('\n')[1:]
+    corpus = []
+    for fmla in lines + EXTRA_FORMULAS:
+        if fmla and parse(fmla) and fmla not in [c[1] for c in corpus]:
+            family = 'prop' if parse(fmla) in [6, 7, 8] else 'fol'
+            corpus.append((family, fmla))
+    return corpus
+
+# parse() calls timed together in one sample, as a single call is too quick to time on its own
+PARSE_CALLS = 100
+
+def time_parse(fmla, repeat):
+    '''Time parse() on one formula and return the timings in ms per call'''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(PARSE_CALLS):
+            parse(fmla)
+        timings.append((time.perf_counter() - start) * 1000 / PARSE_CALLS)
+    return timings
+
+def run_formula(fmla, repeat, **options):
+    '''Time sat() on one formula and return the verdict, timings in ms and the search stats'''
+    timings = []
+    for _ in range(repeat):
+        stats = {}
+        start = time.perf_counter()
+        verdict = sat([theory(fmla)], stats=stats, **options)
+        timings.append((time.perf_counter() - start) * 1000)
+    return verdict, timings, stats
+
+def percentile(values, q):
+    '''Nearest-rank percentile of a list of numbers'''
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def mann_whitney_p(new, old):
+    '''One-sided p-value of the Mann-Whitney U test that new samples are larger than old ones'''
+    ranked = sorted([(v, 0) for v in new] + [(v, 1) for v in old])
+    ranks = [0.0] * len(ranked)
+    ties = 0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    n1, n2 = len(new), len(old)
+    n = n1 + n2
+    u = sum(r for r, (_, group) in zip(ranks, ranked) if group == 0) - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def measure(corpus, repeat, options):
+    '''sat() and parse() timings and rule application counts of every formula in the corpus'''
+    results = {}
+    for family, fmla in corpus:
+        verdict, timings, stats = run_formula(fmla, repeat, **options)
+        parse_timings = time_parse(fmla, repeat)
+        results[fmla] = {'family': family, 'verdict': verdict, 'samples': timings,
+                         'median': statistics.median(timings), 'p90': percentile(timings, 90),
+                         'parse_samples': parse_timings, 'parse_median': statistics.median(parse_timings),
+                         'rules': sum(stats['rules'].values())}
+    return results
+
+def slower(new, old, alpha, slowdown):
+    '''Check if the new samples have a median slowdown times the old one and are significantly larger'''
+    return statistics.median(new) > statistics.median(old) * slowdown and mann_whitney_p(new, old) < alpha
+
+def compare(results, baseline, alpha=0.01, slowdown=1.2):
+    '''Group by family the formulas whose sat() or parse() got significantly slower, used more rules or changed verdict'''
+    regressions = {}
+    for fmla, new in results.items():
+        old = baseline.get(fmla)
+        if old is None:
+            continue
+        reasons = []
+        if slower(new['samples'], old['samples'], alpha, slowdown):
+            reasons.append('median %.3f ms -> %.3f ms' % (old['median'], new['median']))
+        # Baselines saved before parse() was timed have no parse samples
+        if 'parse_samples' in old and slower(new['parse_samples'], old['parse_samples'], alpha, slowdown):
+            reasons.append('parse median %.4f ms -> %.4f ms' % (old['parse_median'], new['parse_median']))
+        if new['rules'] > old['rules']:
+            reasons.append('rule applications %d -> %d' % (old['rules'], new['rules']))
+        if new['verdict'] != old['verdict']:
+            reasons.append('verdict %d -> %d' % (old['verdict'], new['verdict']))
+        if reasons:
+            regressions.setdefault(new['family'], []).append((fmla, reasons))
+    return regressions
+
+def sweep(corpus, repeat, options):
+    '''Total median time per family of every strategy in STRATEGIES, with the verdicts each one gave'''
+    totals, verdicts = {}, {}
+    for name in sorted(STRATEGIES):
+        results = measure(corpus, repeat, dict(options, strategy=name))
+        for fmla, result in results.items():
+            family = totals.setdefault(result['family'], {})
+            family[name] = family.get(name, 0) + result['median']
+            verdicts.setdefault(fmla, {})[name] = result['verdict']
+    return totals, verdicts
+
+def track(args, corpus, mode):
+    '''Save or compare a baseline, returning the exit status'''
+    results = measure(corpus, args.repeat, MODES[mode])
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'mode': mode, 'results': results}, f, indent=1)
+        print('Saved %d formulas to %s' % (len(results), args.save))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.alpha, args.slowdown)
+        for family in sorted(regressions):
+            print('%s: %d regressions' % (family, len(regressions[family])))
+            for fmla, reasons in regressions[family]:
+                print('  %s: %s' % (fmla, ', '.join(reasons)))
+        if regressions:
+            return 1
+        print('No regressions against %s' % args.compare)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Time sat() over the benchmark corpus')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mode', action='append', choices=sorted(MODES), help='branch representations to run')
+    parser.add_argument('--input', default='input.txt')
+    parser.add_argument('--save', metavar='BASELINE', help='store timings of the first mode as a baseline')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare timings of the first mode with a baseline')
+    parser.add_argument('--alpha', type=float, default=0.01, help='significance level of the slowdown test')
+    parser.add_argument('--slowdown', type=float, default=1.2, help='smallest median ratio counted as slower')
+    parser.add_argument('--sweep', action='store_true', help='time every strategy in the first mode')
+    parser.add_argument('--checkpoint-interval', type=float, default=0,
+                        help='seconds between checkpoints in the checkpoint mode, 0 for every round')
+    args = parser.parse_args()
+    MODES['checkpoint']['checkpoint_interval'] = args.checkpoint_interval
+    modes = args.mode or list(MODES)
+    corpus = load_corpus(args.input)
+
+    if args.save or args.compare:
+        sys.exit(track(args, corpus, modes[0]))
+
+    if args.sweep:
+        totals, verdicts = sweep(corpus, args.repeat, MODES[modes[0]])
+        names = sorted(STRATEGIES)
+        print('%-8s %s  %s' % ('family', ' '.join('%16s' % name for name in names), 'fastest'))
+        for family, times in sorted(totals.items()):
+            print('%-8s %s  %s' % (family, ' '.join('%13.3f ms' % times[name] for name in names),
+                                   min(names, key=lambda name: times[name])))
+        for fmla, by_strategy in verdicts.items():
+            if len(set(by_strategy.values())) > 1:
+                print('verdicts differ on %s: %s' % (fmla, by_strategy))
+        return
+
+    print('%-8s %-8s %10s %8s %12s  %s' % ('mode', 'family', 'median ms', 'peak', 'bytes/branch', 'formula'))
+    for mode in modes:
+        total = checkpoint_ms = checkpoints = 0
+        for family, fmla in corpus:
+            verdict, timings, stats = run_formula(fmla, args.repeat, **MODES[mode])
+            per_branch = stats['peak_branch_bytes'] / stats['peak_branches'] if stats['peak_branches'] else 0
+            print('%-8s %-8s %10.3f %8d %12.1f  %s' % (mode, family, statistics.median(timings),
+                                                       stats['peak_branches'], per_branch, fmla))
+            total += timings[-1]
+            checkpoint_ms += stats.get('checkpoint_seconds', 0) * 1000
+            checkpoints += stats.get('checkpoints', 0)
+        if checkpoints:
+            print('%-8s %d checkpoints took %.3f ms, %.1f%% of the last run' % (mode, checkpoints, checkpoint_ms,
+                                                                                 100 * checkpoint_ms / total))
+        if 'checkpoint' in MODES[mode] and os.path.exists(MODES[mode]['checkpoint']):
+            os.remove(MODES[mode]['checkpoint'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# JSON-lines solving server for tableau.py
+# Run with: python server_tableau.py --port 8765   (or --unix /tmp/tableau.sock)
+#
+# Each request is one JSON object per line: {"id": 1, "formula": "(p->q)", "mode": "sat", "budget": 2.5}
+# mode is "parse" or "sat" (default), budget is an optional time limit in seconds for a sat request.
+# {"mode": "stats"} returns the queue depth and latency percentiles instead of solving anything.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# tableau.py runs its coursework driver on import, keep that output off our stdout
+with contextlib.redirect_stdout(io.StringIO()):
+    from tableau import parse, lhs, con, rhs, sat, theory, parseOutputs, satOutput
+
+class BudgetExceeded(Exception):
+    '''Raised in a worker when a request runs past its time budget'''
+
+def on_alarm(signum, frame):
+    raise BudgetExceeded()
+
+def solve(fmla, mode, budget=None):
+    '''Answer a single request inside a worker process, worded like the driver in tableau.py'''
+    parsed = parse(fmla)
+    if mode == 'parse':
+        output = "%s is %s." % (fmla, parseOutputs[parsed])
+        if parsed in [5, 8]:
+            output += " Its left hand side is %s, its connective is %s, and its right hand side is %s." % (lhs(fmla), con(fmla), rhs(fmla))
+        return output
+    if not parsed:
+        return '%s is not a formula.' % fmla
+
+    if budget:
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, budget)
+    try:
+        verdict = sat([theory(fmla)])
+    except BudgetExceeded:
+        verdict = 2 # ran out of budget, may or may not be satisfiable
+    finally:
+        if budget:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return '%s %s.' % (fmla, satOutput[verdict])
+
+def valid_budget(budget):
+    '''Whether a request budget is a number of seconds setitimer() accepts'''
+    return isinstance(budget, (int, float)) and not isinstance(budget, bool) and 0 < budget < 1e9
+
+def percentile(values, q):
+    '''Nearest-rank percentile of a list of numbers'''
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+class SolverServer:
+    '''Dispatches JSON-lines requests to a warm pool of worker processes with bounded concurrency'''
+
+    def __init__(self, workers=None, max_pending=64):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_pending = max_pending
+        self.pool = self.new_pool()
+        self.slots = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.latencies = deque(maxlen=10000)
+
+    def new_pool(self):
+        # Workers are forked so they do not re-import tableau.py and rerun its driver
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+
+    async def warm(self, pool):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(pool, parse, 'p') for _ in range(self.workers)])
+
+    async def replace_pool(self, broken):
+        '''Swap a pool broken by a dead worker, e.g. one killed for running out of memory, for a warm new one'''
+        if self.pool is broken:
+            self.pool = self.new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+            await self.warm(self.pool)
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        '''Warm up the worker pool and start listening on a TCP port or a Unix socket'''
+        self.slots = asyncio.Semaphore(self.max_pending)
+        await self.warm(self.pool)
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def stats(self):
+        '''Queue depth and latency percentiles in milliseconds'''
+        latencies = list(self.latencies)
+        return {'queue_depth': self.waiting, 'in_flight': self.in_flight, 'completed': self.completed,
+                'p50_ms': percentile(latencies, 50), 'p90_ms': percentile(latencies, 90),
+                'p99_ms': percentile(latencies, 99)}
+
+    async def handle(self, reader, writer):
+        '''Serve one connection; stop reading new lines while all slots are taken'''
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError:
+                await self.respond(writer, {'error': 'invalid JSON'})
+                continue
+            if not isinstance(request, dict):
+                await self.respond(writer, {'error': 'expected a JSON object'})
+                continue
+            if request.get('mode') == 'stats':
+                await self.respond(writer, dict(self.stats(), id=request.get('id')))
+                continue
+            self.waiting += 1
+            await self.slots.acquire()
+            self.waiting -= 1
+            task = asyncio.create_task(self.run(request, writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        writer.close()
+
+    async def run(self, request, writer):
+        '''Solve one request in the pool and write its response'''
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            mode = request.get('mode', 'sat')
+            budget = request.get('budget')
+            if mode not in ['parse', 'sat'] or not isinstance(request.get('formula'), str):
+                response = {'error': 'expected a formula and mode parse or sat'}
+            elif budget is not None and not valid_budget(budget):
+                response = {'error': 'expected budget to be a positive number of seconds'}
+            else:
+                loop = asyncio.get_running_loop()
+                try:
+                    pool = self.pool
+                    try:
+                        result = await loop.run_in_executor(pool, solve, request['formula'], mode, budget)
+                    except BrokenProcessPool:
+                        # Requests caught in the pool when a worker died get one more try on a new pool
+                        await self.replace_pool(pool)
+                        result = await loop.run_in_executor(self.pool, solve, request['formula'], mode, budget)
+                    response = {'result': result}
+                except Exception as e:
+                    response = {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.latencies.append(elapsed)
+        self.completed += 1
+        response.update(id=request.get('id'), ms=round(elapsed, 3))
+        await self.respond(writer, response)
+
+    async def respond(self, writer, response):
+        writer.write((json.dumps(response) + '\n').encode())
+        await writer.drain()
+
+async def serve(args):
+    server = SolverServer(args.workers, args.max_pending)
+    listener = await server.start(args.host, args.port, args.unix)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='JSON-lines tableau solving server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--max-pending', type=int, default=64, help='requests solved at once before reading stops')
+    asyncio.run(serve(parser.parse_args()))
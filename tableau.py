@@ -1,25 +1,144 @@
+import contextlib
+import functools
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import re
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # parse_lines() falls back to plain Python
+
 MAX_CONSTANTS = 10
 
 class TableauBranch:
     '''Represents a branch in the tableau with its formulas and applied gamma instances'''
 
-    def __init__(self, formulas, gamma_instances=None):
+    def __init__(self, formulas, gamma_instances=None, introduced=None, deps=None, decisions=()):
         self.formulas = formulas
+        # Constants on the branch in order of appearance, with the number of formulas containing each, and for
+        # each gamma formula how many of them it has been instantiated with (or found already instantiated)
+        self.seen = []
+        self.counts = {}
+        self.watermarks = {}
+        # Pending work: formulas left for a rule other than gamma, gamma formulas and constants past their watermarks
+        self.unexpanded = 0
+        self.gammas = 0
+        self.outstanding = 0
+        for fmla in formulas:
+            self.see(fmla)
         # Key: gamma formula, Value: set of constants instantiated with
         self.gamma_instances = gamma_instances if gamma_instances else {}
+        # Constants introduced by the delta rule, oldest first
+        self.introduced = introduced if introduced else []
+        # (branch id, parent id) when the search is traced
+        self.trace_id = None
+        # Key: formula, Value: frozenset of the (split, alternative) decisions it depends on, when backjumping
+        self.deps = deps if deps else {}
+        # (split, alternative) decisions leading to this branch, oldest first
+        self.decisions = decisions
     
     def copy(self):
-        return TableauBranch(self.formulas.copy(),
-                             {k: v.copy() for k, v in self.gamma_instances.items()}
-                            )
+        branch = TableauBranch([],
+                               {k: v.copy() for k, v in self.gamma_instances.items()},
+                               self.introduced.copy(),
+                               self.deps.copy(),
+                               self.decisions
+                              )
+        branch.formulas = self.formulas.copy()
+        branch.seen = self.seen.copy()
+        branch.counts = self.counts.copy()
+        branch.watermarks = self.watermarks.copy()
+        branch.unexpanded, branch.gammas, branch.outstanding = self.unexpanded, self.gammas, self.outstanding
+        return branch
+
+    def see(self, fmla):
+        '''Count the constants and pending work of a formula added to the branch'''
+        # Sorted, as the order constants are seen in decides the gamma instances tried first
+        for c in sorted(SYMBOLS.constants_of(fmla)):
+            n = self.counts.get(c, 0)
+            self.counts[c] = n + 1
+            if not n:
+                self.seen.append(c)
+                self.outstanding += self.gammas # a new instance for every gamma formula
+        kind = work_kind(fmla)
+        if kind == 'gamma':
+            self.gammas += 1
+            self.outstanding += len(self.seen) - self.watermarks.get(fmla, 0)
+        elif kind == 'rule':
+            self.unexpanded += 1
+
+    def unsee(self, fmla):
+        '''Uncount the constants and pending work of a formula removed from the branch'''
+        kind = work_kind(fmla)
+        if kind == 'gamma':
+            self.gammas -= 1
+            self.outstanding -= len(self.seen) - self.watermarks.pop(fmla, 0)
+        elif kind == 'rule':
+            self.unexpanded -= 1
+        for c in SYMBOLS.constants_of(fmla):
+            self.counts[c] -= 1
+            if not self.counts[c]:
+                del self.counts[c]
+                i = self.seen.index(c)
+                del self.seen[i]
+                # Gamma formulas that had not handled c lose an outstanding instance
+                behind = self.gammas
+                for g, mark in self.watermarks.items():
+                    if mark > i:
+                        self.watermarks[g] = mark - 1
+                        behind -= 1
+                self.outstanding -= behind
+
+    def mark(self, gamma_fmla, mark):
+        '''Move the watermark of a gamma formula on the branch'''
+        self.outstanding -= mark - self.watermarks.get(gamma_fmla, 0)
+        self.watermarks[gamma_fmla] = mark
+
+    def saturated(self):
+        '''Whether no rule is left to apply, from the pending work counts alone'''
+        return not self.unexpanded and not self.outstanding and (self.seen or not self.gammas)
     
     def add_formula(self, fmla):
         if fmla not in self.formulas:
             self.formulas.append(fmla)
+            self.see(fmla)
     
     def remove_formula(self, fmla):
         if fmla in self.formulas:
             self.formulas.remove(fmla)
+            self.unsee(fmla)
+
+    def has_formula(self, fmla):
+        return fmla in self.formulas
+
+    def same_formulas(self, other):
+        return self.formulas == other.formulas
+
+    def is_closed(self):
+        return has_contradiction(self.formulas)
+
+    def nbytes(self):
+        '''Memory held by this branch alone, formula strings and dependency sets are shared between branches'''
+        return (sys.getsizeof(self.formulas) + sys.getsizeof(self.gamma_instances) + sys.getsizeof(self.introduced)
+                + sum(sys.getsizeof(v) for v in self.gamma_instances.values()) + self.bookkeeping_nbytes())
+
+    def bookkeeping_nbytes(self):
+        '''Memory held by the constant counts, watermarks and backjumping labels of this branch'''
+        return (sys.getsizeof(self.seen) + sys.getsizeof(self.counts) + sys.getsizeof(self.watermarks)
+                + sys.getsizeof(self.deps) + sys.getsizeof(self.decisions))
     
     def has_gamma_instance(self, gamma_fmla, const):
         '''Check if we already instantiated this gamma formula with this constant'''
@@ -33,6 +152,834 @@ class TableauBranch:
             self.gamma_instances[gamma_fmla] = set()
         self.gamma_instances[gamma_fmla].add(const)
 
+class FormulaTable:
+    '''Interns formulas as integer IDs, with the complement of each literal, for bitset branches'''
+
+    def __init__(self):
+        self.ids = {}
+        self.formulas = []
+        # Bit of the complementary literal for literals, 0 for other formulas
+        self.complement_bits = []
+
+    def intern(self, fmla):
+        fid = self.ids.get(fmla)
+        if fid is None:
+            fid = len(self.formulas)
+            self.ids[fmla] = fid
+            self.formulas.append(fmla)
+            self.complement_bits.append(0)
+            if is_literal(fmla):
+                complement = fmla[1:] if fmla.startswith('~') else '~' + fmla
+                self.complement_bits[fid] = 1 << self.intern(complement)
+        return fid
+
+class BitsetBranch:
+    '''A branch stored as an int bitset of formula IDs from a shared FormulaTable'''
+
+    __slots__ = ('table', 'bits', 'neg', 'gamma_instances', 'introduced', 'trace_id', 'deps', 'decisions', 'seen',
+                 'counts', 'watermarks', 'unexpanded', 'gammas', 'outstanding')
+
+    def __init__(self, table, formulas=(), gamma_instances=None, introduced=None, deps=None, decisions=()):
+        self.table = table
+        self.bits = 0
+        # Union of the complement bits of the literals on the branch
+        self.neg = 0
+        self.gamma_instances = gamma_instances if gamma_instances else {}
+        self.introduced = introduced if introduced else []
+        self.trace_id = None
+        self.deps = deps if deps else {}
+        self.decisions = decisions
+        self.seen = []
+        self.counts = {}
+        self.watermarks = {}
+        self.unexpanded = 0
+        self.gammas = 0
+        self.outstanding = 0
+        for fmla in formulas:
+            self.add_formula(fmla)
+
+    @property
+    def formulas(self):
+        formulas, bits = [], self.bits
+        while bits:
+            low = bits & -bits
+            formulas.append(self.table.formulas[low.bit_length() - 1])
+            bits ^= low
+        return formulas
+
+    def copy(self):
+        branch = BitsetBranch(self.table,
+                              gamma_instances={k: v.copy() for k, v in self.gamma_instances.items()},
+                              introduced=self.introduced.copy(), deps=self.deps.copy(), decisions=self.decisions)
+        branch.bits, branch.neg = self.bits, self.neg
+        branch.seen = self.seen.copy()
+        branch.counts = self.counts.copy()
+        branch.watermarks = self.watermarks.copy()
+        branch.unexpanded, branch.gammas, branch.outstanding = self.unexpanded, self.gammas, self.outstanding
+        return branch
+
+    def add_formula(self, fmla):
+        fid = self.table.intern(fmla)
+        if self.bits >> fid & 1:
+            return
+        self.bits |= 1 << fid
+        self.neg |= self.table.complement_bits[fid]
+        self.see(fmla)
+
+    def remove_formula(self, fmla):
+        fid = self.table.ids.get(fmla)
+        if fid is None or not self.bits >> fid & 1:
+            return
+        self.bits &= ~(1 << fid)
+        self.unsee(fmla)
+        if self.table.complement_bits[fid]:
+            self.neg = 0
+            for f in self.formulas:
+                self.neg |= self.table.complement_bits[self.table.ids[f]]
+
+    def has_formula(self, fmla):
+        fid = self.table.ids.get(fmla)
+        return fid is not None and bool(self.bits >> fid & 1)
+
+    def same_formulas(self, other):
+        return self.bits == other.bits
+
+    def is_closed(self):
+        return bool(self.bits & self.neg)
+
+    def nbytes(self):
+        '''Memory held by this branch alone, the formula table is shared between branches'''
+        return (sys.getsizeof(self.bits) + sys.getsizeof(self.neg) + sys.getsizeof(self.gamma_instances)
+                + sys.getsizeof(self.introduced) + sum(sys.getsizeof(v) for v in self.gamma_instances.values())
+                + self.bookkeeping_nbytes())
+
+    see = TableauBranch.see
+    bookkeeping_nbytes = TableauBranch.bookkeeping_nbytes
+    unsee = TableauBranch.unsee
+    mark = TableauBranch.mark
+    saturated = TableauBranch.saturated
+    has_gamma_instance = TableauBranch.has_gamma_instance
+    add_gamma_instance = TableauBranch.add_gamma_instance
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Branch Storage
+
+def encode_decisions(decisions):
+    return ','.join('%d.%d' % d for d in decisions)
+
+def decode_decisions(text):
+    return [tuple(int(n) for n in d.split('.')) for d in text.split(',')] if text else []
+
+def encode_branch(branch):
+    '''Serialise a branch to bytes: newline separated formulas, then one gamma formula and its constants per line,
+    the introduced constants, and the dependencies and decisions of a backjumping search'''
+    gammas = '\n'.join(g + '\t' + ','.join(sorted(cs)) for g, cs in branch.gamma_instances.items())
+    deps = '\n'.join(f + '\t' + encode_decisions(sorted(ds)) for f, ds in branch.deps.items())
+    return ('\n'.join(branch.formulas) + '\0' + gammas + '\0' + ','.join(branch.introduced) + '\0' + deps
+            + '\0' + encode_decisions(branch.decisions)).encode()
+
+def decode_branch(data):
+    '''Rebuild a branch serialised by encode_branch, declaring the witnesses it introduced'''
+    formulas, gammas, introduced, deps, decisions = data.decode().split('\0')
+    introduced = introduced.split(',') if introduced else []
+    SYMBOLS.restore_fresh(introduced)
+    gamma_instances = {}
+    for line in gammas.split('\n') if gammas else []:
+        g, cs = line.split('\t')
+        gamma_instances[g] = set(cs.split(',')) if cs else set()
+    dependencies = {}
+    for line in deps.split('\n') if deps else []:
+        f, ds = line.split('\t')
+        dependencies[f] = frozenset(decode_decisions(ds))
+    return TableauBranch(formulas.split('\n') if formulas else [], gamma_instances, introduced, dependencies,
+                         tuple(decode_decisions(decisions)))
+
+class Frontier:
+    '''Pending branches, kept in memory up to limit and spilled to a temporary file beyond it
+
+    Iterating takes the branches out, so a frontier is read once and is empty, and can be refilled, afterwards.
+    '''
+
+    def __init__(self, limit=None, decode=decode_branch, batch=256, spill_dir=None):
+        self.limit = limit
+        self.decode = decode
+        self.batch = batch
+        self.spill_dir = spill_dir
+        self.memory = []
+        self.spill = None
+        self.spilled = 0
+
+    def __len__(self):
+        return len(self.memory) + self.spilled
+
+    def append(self, branch):
+        if self.limit is None or len(self.memory) < self.limit:
+            self.memory.append(branch)
+            return
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile(dir=self.spill_dir)
+        data = encode_branch(branch)
+        self.spill.write(struct.pack('<I', len(data)) + data)
+        self.spilled += 1
+
+    def extend(self, branches):
+        for branch in branches:
+            self.append(branch)
+
+    def __iter__(self):
+        '''Take out the in-memory branches, then read the spilled ones back in batches'''
+        memory, spill, remaining = self.memory, self.spill, self.spilled
+        self.memory, self.spill, self.spilled = [], None, 0
+        yield from memory
+        if spill is None:
+            return
+        spill.flush()
+        spill.seek(0)
+        while remaining:
+            batch = []
+            for _ in range(min(self.batch, remaining)):
+                size, = struct.unpack('<I', spill.read(4))
+                batch.append(self.decode(spill.read(size)))
+            remaining -= len(batch)
+            yield from batch
+        spill.close()
+
+    def save(self, f):
+        '''Write every branch to f in the spill format, leaving the frontier as it was'''
+        for branch in self.memory:
+            data = encode_branch(branch)
+            f.write(struct.pack('<I', len(data)) + data)
+        if self.spill is not None:
+            self.spill.flush()
+            self.spill.seek(0)
+            shutil.copyfileobj(self.spill, f)
+            self.spill.seek(0, os.SEEK_END)
+
+# Checkpoint files start with this magic and format version, then a JSON header and the branches of each frontier
+CHECKPOINT_MAGIC = b'TBCK'
+CHECKPOINT_VERSION = 1
+
+def write_checkpoint(path, header, frontiers):
+    '''Replace the file at path with the header and frontiers, through a temporary file so it is never half written'''
+    head = json.dumps(dict(header, frontiers=[len(f) for f in frontiers])).encode()
+    partial = path + '.partial'
+    with open(partial, 'wb') as f:
+        f.write(CHECKPOINT_MAGIC + struct.pack('<HI', CHECKPOINT_VERSION, len(head)) + head)
+        for frontier in frontiers:
+            frontier.save(f)
+    os.replace(partial, path)
+
+def read_checkpoint(path, new_frontier):
+    '''Header and frontiers of a checkpoint written by write_checkpoint, each frontier made by new_frontier()'''
+    with open(path, 'rb') as f:
+        if f.read(4) != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} is not a tableau checkpoint")
+        version, size = struct.unpack('<HI', f.read(6))
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} has checkpoint format {version}, expected {CHECKPOINT_VERSION}")
+        header = json.loads(f.read(size))
+        frontiers = []
+        for count in header['frontiers']:
+            frontier = new_frontier()
+            for _ in range(count):
+                size, = struct.unpack('<I', f.read(4))
+                frontier.append(frontier.decode(f.read(size)))
+            frontiers.append(frontier)
+    return header, frontiers
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Search State
+
+class SearchOptions:
+    '''How sat() searches, with everything beyond the plain breadth-first search off by default'''
+
+    def __init__(self, initial_constants=2, blocking=False, compact=False, stats=None, frontier_limit=None,
+                 spill_dir=None, trace=None, pure_literals=False, simplify=False, tabling=None, backjumping=False,
+                 relevance=False, checkpoint=None, checkpoint_interval=60.0, resume=False, progress=None,
+                 symmetry=False, linear=False, strategy=None):
+        if checkpoint and backjumping:
+            raise ValueError("checkpoints cannot be taken of a backjumping search")
+        if initial_constants is not None and initial_constants < 1:
+            raise ValueError(f"initial_constants must be at least 1, got {initial_constants}")
+        # Constants a branch may have before it is parked until the rest is done, doubled up to max_constants
+        # whenever parked branches resume, or None for max_constants from the start
+        self.initial_constants = initial_constants
+        # Give no fresh witnesses to introduced constants whose literals an earlier constant's cover; a branch
+        # left open by it is only satisfiable if blocked_model() holds, and undetermined otherwise
+        self.blocking = blocking
+        # Store branches as BitsetBranch objects over one FormulaTable
+        self.compact = compact
+        # Dict filled with rounds, peak live branches and their bytes, peak spilled branches and rule counts
+        self.stats = stats
+        # Most pending branches of a round held in memory, the rest spill to a file in spill_dir
+        self.frontier_limit = frontier_limit
+        self.spill_dir = spill_dir
+        # Tracer recording every rule application, closed branch and the open branch found
+        self.trace = trace
+        # Drop formulas whose predicates occur with one sign only on their branch (see prune_pure())
+        self.pure_literals = pure_literals
+        # Put every formula through simplify_formula() first, branch objects are replaced by their formulas
+        self.simplify = simplify
+        # ClosureTable, or True for a new one, cutting branches that contain a closed state or repeat an
+        # expanded one, and answering 1 for a known open state
+        self.tabling = tabling
+        # Label formulas with the beta decisions they depend on, pruning below conflicts (see DependencyTracker)
+        self.backjumping = backjumping
+        # Add gamma instances that can close the branch first, and the others one at a time when nothing else is left
+        self.relevance = relevance
+        # File the frontiers, bound and rule counts are written to at the start of a round once
+        # checkpoint_interval seconds have passed, and with resume read back from to carry on a search
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        # Progress publishing snapshots of the running search
+        self.progress = progress
+        # Drop branches of a round equal to another up to renaming introduced constants (see canonical_state())
+        self.symmetry = symmetry
+        # Apply non-branching rules in place in one pass per branch and round (see expand_linear())
+        self.linear = linear
+        # Strategy, or the name of one in STRATEGIES, ranking the formulas to expand
+        self.strategy = get_strategy(strategy)
+
+class SearchContext:
+    '''Options and caches shared by every branch of one satisfiability search'''
+
+    def __init__(self, blocking=False, tracer=None, dependencies=None, relevance=False, strategy=None):
+        # blocking, relevance and strategy as in SearchOptions
+        self.blocking = blocking
+        self.relevance = relevance
+        self.strategy = strategy
+        # Tracer recording every rule application, if any
+        self.tracer = tracer
+        # DependencyTracker labelling formulas with beta decisions, when backjumping
+        self.dependencies = dependencies
+        # Key: rule kind, Value: number of applications
+        self.rule_counts = Counter()
+        # Key: (gamma formula, constant), Value: the instance, one shared string per distinct instance
+        self.instances = {}
+        self.shared = {}
+        # Key: formula, Value: frozenset of (predicate, sign) pairs of its atoms
+        self.polarities = {}
+        # Key: formula, Value: frozenset of (atom, sign) pairs
+        self.occurrences = {}
+
+    def polarity(self, fmla):
+        '''Predicates of the atoms in a formula with the sign of each occurrence, 1 positive and -1 negative'''
+        found = self.polarities.get(fmla)
+        if found is None:
+            found = self.polarities[fmla] = frozenset(occurrence_signs(fmla))
+        return found
+
+    def relevant(self, branch, inst):
+        '''Check if an instance contains an atom whose complementary literal is on the branch'''
+        found = self.occurrences.get(inst)
+        if found is None:
+            found = self.occurrences[inst] = frozenset(signed_atoms(inst))
+        return any(branch.has_formula('~' + atom if sign > 0 else atom) for atom, sign in found)
+
+    def instance(self, gamma_fmla, const):
+        '''Instantiate a universal formula with a constant, substituting once per search'''
+        key = (gamma_fmla, const)
+        inst = self.instances.get(key)
+        if inst is None:
+            var, body = SYMBOLS.quantifier(gamma_fmla)
+            inst = substitute(body, var, const)
+            inst = self.instances[key] = self.shared.setdefault(inst, inst)
+        return inst
+
+class ClosureTable:
+    '''Known results of branch states, keyed by the set of formulas on the branch
+
+    A state is closed once it closes itself or every state it expanded to is closed, and any superset of a
+    closed state closes too. Gamma bookkeeping is left out of the key: it only decides which instances are
+    added next, not whether the formulas are satisfiable. The same table can be shared between searches.
+    '''
+
+    def __init__(self):
+        # Key: state, Value: the states it expanded to, and the reverse
+        self.children = {}
+        self.parents = {}
+        self.closed = set()
+        # Key: smallest formula of a closed expanded state, Value: those states
+        self.index = {}
+        # States found open with nothing left to expand
+        self.open = set()
+
+    def expanded(self, state, children):
+        self.children[state] = children
+        for child in children:
+            self.parents.setdefault(child, set()).add(state)
+
+    def close(self, state):
+        '''Record a closed state and close every parent whose other children are closed as well'''
+        stack = [state]
+        while stack:
+            s = stack.pop()
+            if s in self.closed:
+                continue
+            self.closed.add(s)
+            if s in self.children and s:
+                self.index.setdefault(min(s), []).append(s)
+            for parent in self.parents.pop(s, ()):
+                if all(c in self.closed for c in self.children[parent]):
+                    stack.append(parent)
+
+    def subsumed(self, state):
+        '''Check if the state contains a closed state'''
+        if state in self.closed:
+            return True
+        for fmla in state:
+            for closed in self.index.get(fmla, ()):
+                if closed <= state:
+                    return True
+        return False
+
+# Dependency of formulas that were derived with the delta rule, whose witness is only fresh on its own branch
+DELTA = (-1, 0)
+
+class DependencyTracker:
+    '''Labels formulas with the beta decisions they depend on, and learns from closed branches what else is closed
+
+    A closed branch depends on the decisions of its two complementary literals. Every branch below the deepest
+    of those decisions closes for the same reason and is pruned. Once both alternatives of a split are known to
+    close, the union of their conflicts without that split is a conflict of the branch above it. Unless a
+    delta rule took part, the formulas chosen at the decisions of a conflict also form a nogood: any branch of
+    the same search containing all of them is closed. Several initial branches are the alternatives of a split
+    of their own, so a conflict only closes the whole tableau when it involves no decision at all.
+    '''
+
+    def __init__(self):
+        self.splits = 0
+        # Key: split, Value: number of alternatives when it is not 2
+        self.alternatives = {}
+        # Key: decision, Value: frozenset of the formulas it added
+        self.choices = {}
+        # Decisions whose branches are all closed
+        self.dead = set()
+        # Key: split, Value: {alternative: conflict}
+        self.conflicts = {}
+        # Key: smallest formula of a nogood, Value: those nogoods
+        self.nogoods = {}
+
+    def rule(self, branch, rule, target, expanded):
+        '''Label the formulas each child got from the target'''
+        base = branch.deps.get(target, frozenset())
+        if rule == 'delta':
+            base = base | {DELTA}
+        before = set(branch.formulas)
+        for alt, child in enumerate(expanded):
+            deps = base
+            new = frozenset(f for f in child.formulas if f not in before)
+            if rule == 'beta':
+                decision = (self.splits, alt)
+                self.choices[decision] = new
+                child.decisions = branch.decisions + (decision,)
+                deps = base | {decision}
+            child.deps.pop(target, None)
+            for f in new:
+                child.deps[f] = deps
+        if rule == 'beta':
+            self.splits += 1
+
+    def roots(self, branches):
+        '''Label the formulas of several initial branches with a decision each, as if one split made them'''
+        if len(branches) < 2:
+            return
+        for alt, branch in enumerate(branches):
+            decision = (self.splits, alt)
+            self.choices[decision] = frozenset(branch.formulas)
+            branch.decisions = branch.decisions + (decision,)
+            for f in branch.formulas:
+                branch.deps[f] = branch.deps.get(f, frozenset()) | {decision}
+        self.alternatives[self.splits] = len(branches)
+        self.splits += 1
+
+    def pruned(self, branch):
+        '''Check if the branch is below a dead decision or contains a nogood'''
+        if not self.dead.isdisjoint(branch.decisions):
+            return True
+        formulas = set(branch.formulas)
+        for fmla in formulas:
+            for nogood in self.nogoods.get(fmla, ()):
+                if nogood <= formulas:
+                    return True
+        return False
+
+    def closed(self, branch):
+        '''Learn from a closed branch, returning True if the whole tableau is closed'''
+        formulas = set(branch.formulas)
+        no_deps = frozenset()
+        conflicts = [branch.deps.get(f, no_deps) | branch.deps.get('~' + f, no_deps)
+                     for f in formulas if '~' + f in formulas]
+        conflict = min(conflicts, key=lambda c: max(c, default=DELTA))
+        while True:
+            decisions = conflict - {DELTA}
+            if not decisions:
+                return True
+            if DELTA not in conflict:
+                nogood = frozenset().union(*(self.choices[d] for d in decisions))
+                if nogood:
+                    self.nogoods.setdefault(min(nogood), []).append(nogood)
+            split, alt = max(decisions)
+            self.dead.add((split, alt))
+            known = self.conflicts.setdefault(split, {})
+            known.setdefault(alt, conflict)
+            if len(known) < self.alternatives.get(split, 2):
+                return False
+            conflict = frozenset().union(*known.values()) - {(split, a) for a in known}
+
+class Tracer:
+    '''Records rule applications of a search as JSON lines, optionally sampled or kept in a ring buffer
+
+    Events are {"e": "rule", "b": branch, "p": parent, "r": rule, "t": target, "c": children, "n": new formulas
+    per child} and {"e": "close" or "open", "b": branch}, with formulas given by id. dump() ends the trace with
+    {"e": "formulas", "f": [...]} listing the formula of each id.
+    '''
+
+    def __init__(self, sink=None, sample=1.0, ring=None, seed=None):
+        self.file = open(sink, 'w') if isinstance(sink, str) else sink
+        self.owns_file = isinstance(sink, str)
+        self.sample = sample
+        self.ring = deque(maxlen=ring) if ring else None
+        self.table = FormulaTable()
+        self.random = random.Random(seed)
+        self.branches = 0
+
+    def ids(self, branch):
+        if branch.trace_id is None:
+            branch.trace_id = (self.branches, None)
+            self.branches += 1
+        return branch.trace_id
+
+    def emit(self, event):
+        if self.sample < 1 and self.random.random() >= self.sample:
+            return
+        if self.ring is not None:
+            self.ring.append(event)
+        elif self.file:
+            self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+
+    def rule(self, branch, rule, target, expanded):
+        bid, parent = self.ids(branch)
+        before = set(branch.formulas)
+        children, new = [], []
+        for child in expanded:
+            if child is not branch:
+                child.trace_id = (self.branches, bid)
+                self.branches += 1
+            children.append(child.trace_id[0])
+            new.append([self.table.intern(f) for f in child.formulas if f not in before])
+        self.emit({'e': 'rule', 'b': bid, 'p': parent, 'r': rule, 't': self.table.intern(target),
+                   'c': children, 'n': new})
+
+    def closed(self, branch):
+        self.emit({'e': 'close', 'b': self.ids(branch)[0]})
+
+    def opened(self, branch):
+        self.emit({'e': 'open', 'b': self.ids(branch)[0]})
+
+    def dump(self, sink=None):
+        '''Write out the ring buffer, if any, and the formula table'''
+        out = open(sink, 'w') if isinstance(sink, str) else sink or self.file
+        for event in self.ring or []:
+            out.write(json.dumps(event, separators=(',', ':')) + '\n')
+        out.write(json.dumps({'e': 'formulas', 'f': self.table.formulas}, separators=(',', ':')) + '\n')
+        out.flush()
+        if isinstance(sink, str):
+            out.close()
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+class Progress:
+    '''Publishes snapshots of a running search every interval seconds, and on signum if one is given
+
+    A snapshot is a dict of rounds done, live, parked and closed branches, the most constants on a branch this
+    round against the bound and the limit, rule applications and their rate, and the frontier growth: children
+    per branch expanded so far this round, with the size of the next round it projects. Snapshots go to
+    callback, to path as Prometheus text metrics, or to stderr as JSON when neither is given. The clock is read
+    once per branch, so progress can be left on.
+    '''
+
+    def __init__(self, callback=None, path=None, interval=10.0, signum=None):
+        self.callback = callback
+        self.path = path
+        self.interval = interval
+        self.snapshots = 0
+        self.requested = False
+        self.signum = signum
+        self.previous_handler = signal.signal(signum, self.request) if signum is not None else None
+        self.start(Counter(), MAX_CONSTANTS)
+
+    def request(self, signum=None, frame=None):
+        '''Publish a snapshot at the next branch, safe to call from a signal handler'''
+        self.requested = True
+
+    def start(self, rule_counts, limit):
+        self.rule_counts = rule_counts
+        self.limit = limit
+        self.started = self.last = time.monotonic()
+        self.due = self.started + self.interval
+        self.last_rules = 0
+        self.rounds = self.closed = self.parked = self.bound = 0
+        self.round_size = self.done = self.children = self.max_constants = 0
+
+    def new_round(self, size, bound):
+        self.rounds += 1
+        self.round_size = size
+        self.bound = bound
+        self.done = self.children = self.max_constants = 0
+
+    def tick(self, branch, children, parked):
+        '''Account for a branch about to be processed, given the sizes of the next round and the parked frontier'''
+        self.done += 1
+        self.children = children
+        self.parked = parked
+        if len(branch.seen) > self.max_constants:
+            self.max_constants = len(branch.seen)
+        if self.requested or time.monotonic() >= self.due:
+            self.publish()
+
+    def snapshot(self):
+        now = time.monotonic()
+        rules = sum(self.rule_counts.values())
+        processed = max(self.done - 1, 0)
+        growth = self.children / processed if processed else 0.0
+        return {'rounds': self.rounds, 'live_branches': self.round_size - processed + self.children,
+                'parked_branches': self.parked, 'closed_branches': self.closed, 'max_constants': self.max_constants,
+                'constant_bound': self.bound, 'constant_limit': self.limit, 'rules': rules,
+                'rules_per_second': (rules - self.last_rules) / (now - self.last) if now > self.last else 0.0,
+                'growth': growth, 'projected_branches': round(self.round_size * growth),
+                'elapsed_seconds': now - self.started}
+
+    def publish(self):
+        '''Send a snapshot to the callback and the metrics file, or to stderr if there are neither'''
+        snapshot = self.snapshot()
+        self.requested = False
+        self.last, self.last_rules = time.monotonic(), snapshot['rules']
+        self.due = self.last + self.interval
+        self.snapshots += 1
+        if self.callback:
+            self.callback(snapshot)
+        if self.path:
+            partial = self.path + '.partial'
+            with open(partial, 'w') as f:
+                f.write(prometheus_text(snapshot))
+            os.replace(partial, self.path)
+        if not self.callback and not self.path:
+            sys.stderr.write(json.dumps(snapshot) + '\n')
+        return snapshot
+
+    def close(self):
+        '''Put back the signal handler replaced by this Progress'''
+        if self.signum is not None:
+            signal.signal(self.signum, self.previous_handler)
+            self.signum = None
+
+# Snapshot values that only ever go up, the others are gauges
+PROGRESS_COUNTERS = ['rounds', 'closed_branches', 'rules']
+
+def prometheus_text(snapshot, prefix='tableau_'):
+    '''Render a Progress snapshot in the Prometheus text exposition format'''
+    lines = []
+    for key, value in snapshot.items():
+        lines.append(f"# TYPE {prefix}{key} {'counter' if key in PROGRESS_COUNTERS else 'gauge'}")
+        lines.append(f"{prefix}{key} {value}")
+    return '\n'.join(lines) + '\n'
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Symbol Table
+
+# Characters of the connectives, quantifiers and brackets
+STRUCTURE_CHARS = frozenset('AE~(),&->\\/')
+
+# Most entries a memo of formulas holds before it is emptied, so long running processes stay bounded
+MEMO_LIMIT = 1 << 16
+
+class SymbolTable:
+    '''Interned predicates, variables and constants, each with an integer id
+
+    The default vocabulary is the coursework one: binary predicates P, Q, R, S, variables x, y, z, w and
+    every other lowercase letter as a constant. declare() adds multi-character names and other arities.
+    Atoms are split into (predicate id, argument ids) once and memoised, as are the constants of a formula.
+    '''
+
+    def __init__(self, predicates=None, variables=None, constants=None):
+        # Key: name, Value: id, with names[id] == name
+        self.ids = {}
+        self.names = []
+        # Key: predicate id, Value: arity
+        self.arity = {}
+        self.variables = set()
+        self.constants = set()
+        self.chars = STRUCTURE_CHARS
+        # Key: atom string, Value: (predicate id, argument ids), or None if it is not an atom
+        self.atoms = {}
+        # Key: formula, Value: frozenset of the constants in it
+        self.formula_constants = {}
+        # Memos of formulas kept elsewhere that depend on the vocabulary, emptied whenever it changes
+        self.memos = []
+        # Names handed out by fresh_constant(), in order, and how many were made up
+        self.fresh = []
+        self.generated = 0
+        # Constants declared by fresh_constant() and restore_fresh(), undeclared again by scope()
+        self.witnesses = []
+        for name, arity in (predicates or {'P': 2, 'Q': 2, 'R': 2, 'S': 2}).items():
+            self.declare(name, 'predicate', arity)
+        for name in variables or 'xyzw':
+            self.declare(name, 'variable')
+        for name in constants or [c for c in 'abcdefghijklmnopqrstuvwxyz' if c not in self.ids]:
+            self.declare(name, 'constant')
+        self.fresh = [self.names[i] for i in sorted(self.constants)]
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.chars = self.chars | set(name)
+        return i
+
+    def declare(self, name, kind, arity=None):
+        '''Add a predicate of the given arity, a variable or a constant'''
+        if kind == 'predicate':
+            valid = name[:1].isupper() and name not in ['A', 'E'] and (name[1:] == '' or name[1:].isalnum())
+        else:
+            valid = name[:1].islower() and all(c.islower() or c.isdigit() for c in name)
+        if not valid or kind not in ['predicate', 'variable', 'constant']:
+            raise ValueError(f"cannot declare {name!r} as a {kind}")
+        i = self.intern(name)
+        declared = 'predicate' if i in self.arity else 'variable' if i in self.variables \
+            else 'constant' if i in self.constants else kind
+        if declared != kind or self.arity.get(i, arity) != arity:
+            raise ValueError(f"{name!r} is already declared as a {declared}")
+        if kind == 'predicate':
+            self.arity[i] = arity
+        elif kind == 'variable':
+            self.variables.add(i)
+        else:
+            self.constants.add(i)
+        # Strings rejected before may be atoms now
+        self.atoms = {k: v for k, v in self.atoms.items() if v is not None}
+        self.formula_constants.clear()
+        for memo in self.memos:
+            memo.clear()
+        return i
+
+    def atom(self, fmla):
+        '''Split an atom into (predicate id, argument ids), or return None if fmla is not an atom'''
+        try:
+            return self.atoms[fmla]
+        except KeyError:
+            pass
+        open_at = fmla.find('(')
+        if open_at <= 0 or not fmla.endswith(')'):
+            return None
+        parts = None
+        pred = self.ids.get(fmla[:open_at])
+        args = tuple(self.ids.get(t) for t in fmla[open_at + 1:-1].split(','))
+        if pred in self.arity and self.arity[pred] == len(args) \
+                and all(t in self.variables or t in self.constants for t in args):
+            parts = (pred, args)
+        if len(self.atoms) >= MEMO_LIMIT:
+            self.atoms.clear()
+        self.atoms[fmla] = parts
+        return parts
+
+    def quantifier(self, fmla):
+        '''Split Qv... into its bound variable and body, or return (None, None) if it is not quantified'''
+        if len(fmla) < 3 or fmla[0] not in ['A', 'E']:
+            return None, None
+        end = 1
+        while end < len(fmla) - 1 and (fmla[end].islower() or fmla[end].isdigit()):
+            end += 1
+        # The body may itself start with a propositional atom, e.g. Axp
+        for i in range(end, 1, -1):
+            var = self.ids.get(fmla[1:i])
+            if var in self.variables:
+                return fmla[1:i], fmla[i:]
+        return None, None
+
+    def constants_of(self, fmla):
+        '''Constants occurring in a formula'''
+        found = self.formula_constants.get(fmla)
+        if found is None:
+            found = frozenset(self.collect_constants(fmla))
+            if len(self.formula_constants) >= MEMO_LIMIT:
+                self.formula_constants.clear()
+            self.formula_constants[fmla] = found
+        return found
+
+    def collect_constants(self, fmla):
+        if fmla.startswith('~'):
+            return self.constants_of(fmla[1:])
+        parts = self.atom(fmla)
+        if parts:
+            return {self.names[t] for t in parts[1] if t in self.constants}
+        var, body = self.quantifier(fmla)
+        if var:
+            return self.constants_of(body)
+        if fmla.startswith('(') and fmla.endswith(')') and con(fmla):
+            return self.constants_of(lhs(fmla)) | self.constants_of(rhs(fmla))
+        return set()
+
+    def fresh_constant(self, used):
+        '''The first constant not in used, declaring a new one named c1, c2, ... once the letters run out'''
+        for name in self.fresh:
+            if name not in used:
+                return name
+        while True:
+            self.generated += 1
+            name = f"c{self.generated}"
+            i = self.ids.get(name)
+            if i is None or i not in self.arity and i not in self.variables and i not in self.constants:
+                self.declare(name, 'constant')
+                self.witnesses.append(name)
+                self.fresh.append(name)
+                if name not in used:
+                    return name
+
+    def restore_fresh(self, names):
+        '''Hand out the names fresh_constant() returned in another process, e.g. before resuming its checkpoint'''
+        for name in names:
+            if name not in self.fresh:
+                if self.ids.get(name) not in self.constants:
+                    self.declare(name, 'constant')
+                    self.witnesses.append(name)
+                self.fresh.append(name)
+
+    @contextlib.contextmanager
+    def scope(self):
+        '''Undeclare the constants fresh_constant() and restore_fresh() declare inside the block when it ends'''
+        fresh, generated, witnesses = len(self.fresh), self.generated, len(self.witnesses)
+        try:
+            yield self
+        finally:
+            if len(self.witnesses) > witnesses:
+                for name in self.witnesses[witnesses:]:
+                    self.constants.discard(self.ids[name])
+                del self.witnesses[witnesses:]
+                self.chars = STRUCTURE_CHARS.union(*(self.names[i] for i in self.arity.keys() | self.variables
+                                                     | self.constants))
+                self.atoms.clear()
+                self.formula_constants.clear()
+                for memo in self.memos:
+                    memo.clear()
+            del self.fresh[fresh:]
+            self.generated = generated
+
+# Vocabulary used by the parser and the tableau
+SYMBOLS = SymbolTable()
+
+def scoped(search):
+    '''Run a search in its own SYMBOLS.scope(), so the witnesses it names do not become part of the vocabulary'''
+    @functools.wraps(search)
+    def run(*args, **kwargs):
+        with SYMBOLS.scope():
+            return search(*args, **kwargs)
+    return run
+
 #------------------------------------------------------------------------------------------------------------------------------:
 # Parsing Functions
 
@@ -78,18 +1025,8 @@ def is_prop_atom(fmla):
     return fmla in ['p', 'q', 'r', 's']
 
 def is_fol_atom(fmla):
-    '''Must match pattern P(t1,t2) where P in {P, Q, R, S} and t1,t2 are terms'''
-    if len(fmla) != 6:
-        return False
-    if fmla[0] not in ['P', 'Q', 'R', 'S']:
-        return False
-    if fmla[1] != '(' or fmla[3] != ',' or fmla[5] != ')':
-        return False
-    
-    VARS = ['x', 'y', 'z', 'w']
-    CONSTS = [chr(c) for c in range(ord('a'), ord('z')+1)]
-    TERMS = VARS + CONSTS
-    return fmla[2] in TERMS and fmla[4] in TERMS
+    '''Must match pattern P(t1,...,tn) where P is a predicate of arity n in SYMBOLS and t1,...,tn are terms'''
+    return SYMBOLS.atom(fmla) is not None
 
 def lhs(fmla):
     '''Return left hand side of the main connective'''
@@ -136,8 +1073,8 @@ def parse(fmla):
         return 0 # not a formula
     
     # FOL Quantifiers
-    if len(fmla) > 2 and fmla[0] in ['A', 'E'] and fmla[1] in ['x', 'y', 'z', 'w']:
-        subfmla = fmla[2:]
+    var, subfmla = SYMBOLS.quantifier(fmla)
+    if var:
         subfmla_parsed = parse(subfmla)
         if subfmla_parsed == 0:
             return 0 # not a formula
@@ -170,6 +1107,48 @@ def parse(fmla):
         return 0 # not a formula  
     return 0 # not a formula
 
+#------------------------------------------------------------------------------------------------------------------------------:
+# Bulk Parsing
+
+def plausible_formula(fmla):
+    '''Cheap necessary conditions for parse(fmla) != 0: non-empty, legal characters, balanced parentheses'''
+    return bool(fmla) and SYMBOLS.chars.issuperset(fmla) and balanced_parentheses(fmla)
+
+def prevalidate(lines):
+    '''Check plausible_formula() for a block of lines at once over a uint8 buffer'''
+    if np is None:
+        return [plausible_formula(line) for line in lines]
+    encoded = [line.encode() for line in lines]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    ok = lengths > 0
+    if not ok.any():
+        return ok.tolist()
+    buf = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[ok]
+
+    legal = np.zeros(256, dtype=bool)
+    legal[np.frombuffer(''.join(SYMBOLS.chars).encode(), dtype=np.uint8)] = True
+    illegal = np.add.reduceat((~legal[buf]).astype(np.int64), starts)
+
+    # Depth after each character, relative to the start of its line
+    steps = (buf == ord('(')).astype(np.int64) - (buf == ord(')'))
+    depth = np.cumsum(steps)
+    before = np.concatenate(([0], depth))[starts]
+    depth -= np.repeat(before, lengths[ok])
+    lowest = np.minimum.reduceat(depth, starts)
+    final = np.concatenate((depth[starts[1:] - 1], depth[-1:]))
+
+    ok[ok] = (illegal == 0) & (lowest >= 0) & (final == 0)
+    return ok.tolist()
+
+def parse_lines(lines, block=4096):
+    '''parse() every line, sending only lines that pass prevalidate() to the full parser'''
+    results = []
+    for i in range(0, len(lines), block):
+        chunk = lines[i:i + block]
+        results.extend(parse(line) if ok else 0 for line, ok in zip(chunk, prevalidate(chunk)))
+    return results
+
 #------------------------------------------------------------------------------------------------------------------------------:
 # Tableau Implementation
 
@@ -183,6 +1162,20 @@ def is_literal(fmla):
             return True
     return False
 
+# Kind of work each formula gives a branch, memoised as parse() is recursive
+WORK_KINDS = {}
+SYMBOLS.memos.append(WORK_KINDS)
+
+def work_kind(fmla):
+    ''''literal', 'gamma' for a universal formula that stays on its branch, or 'rule' for one expanded away'''
+    kind = WORK_KINDS.get(fmla)
+    if kind is None:
+        kind = 'literal' if is_literal(fmla) else 'gamma' if parse(fmla) == 3 else 'rule'
+        if len(WORK_KINDS) >= MEMO_LIMIT:
+            WORK_KINDS.clear()
+        WORK_KINDS[fmla] = kind
+    return kind
+
 def has_contradiction(formulas):
     '''Check for a contradiction in the branch list'''
     for fmla in formulas:
@@ -195,43 +1188,10 @@ def has_contradiction(formulas):
     return False
 
 def get_constants(branch):
-    '''Recursively collect all constants in the branch'''
+    '''Collect all constants in the branch'''
     constants = set()
-    VARS = ['x', 'y', 'z', 'w']
-
-    # Recursively enter formula and collect constants
-    def collect(fmla):
-        if not fmla:
-            return
-        
-        if fmla.startswith('~'):
-            collect(fmla[1:])
-            return
-        
-        if is_fol_atom(fmla):
-            t1, t2 = fmla[2], fmla[4]
-            if t1 not in VARS:
-                constants.add(t1)
-            if t2 not in VARS:
-                constants.add(t2)
-            return
-        
-        if len(fmla) > 2 and fmla[0] in ['A', 'E'] and fmla[1] in VARS:
-            collect(fmla[2:])
-            return
-        
-        if fmla.startswith('(') and fmla.endswith(')'):
-            connective = con(fmla)
-            if connective:
-                left = lhs(fmla)
-                right = rhs(fmla)
-                collect(left)
-                collect(right)
-                return
-        return
-    
     for fmla in branch:
-        collect(fmla)
+        constants |= SYMBOLS.constants_of(fmla)
     return constants
 
 def substitute(fmla, var, const):
@@ -242,20 +1202,18 @@ def substitute(fmla, var, const):
     if fmla.startswith('~'):
         return '~' + substitute(fmla[1:], var, const)
     
-    if is_fol_atom(fmla):
-        P, t1, t2 = fmla[0], fmla[2], fmla[4]
-        if t1 == var:
-            t1 = const
-        if t2 == var:
-            t2 = const
-        return f"{P}({t1},{t2})"
+    parts = SYMBOLS.atom(fmla)
+    if parts:
+        pred, args = parts
+        names = [SYMBOLS.names[t] for t in args]
+        return f"{SYMBOLS.names[pred]}({','.join(const if t == var else t for t in names)})"
     
-    if len(fmla) > 2 and fmla[0] in ['A', 'E'] and fmla[1] in ['x', 'y', 'z', 'w']:
-        quant_var = fmla[1]
+    quant_var, body = SYMBOLS.quantifier(fmla)
+    if quant_var:
         if quant_var == var:
             return fmla  # Bound variable - don't substitute
         else:
-            return fmla[0] + fmla[1] + substitute(fmla[2:], var, const)
+            return fmla[0] + quant_var + substitute(body, var, const)
     
     if fmla.startswith('(') and fmla.endswith(')'):
         left = lhs(fmla)
@@ -265,123 +1223,313 @@ def substitute(fmla, var, const):
             return '(' + substitute(left, var, const) + connective + substitute(right, var, const) + ')'
     return fmla
 
-def select_target_formula(branch):
-    '''Find the next formula to expand, priority: double negation > negated quantifiers > alpha > beta > delta > gamma'''
-    target = None
-    priority = 1000 # lower number = higher priority
+def constant_label(formulas, const):
+    '''Literals on the branch whose only term is const, with const replaced by *'''
+    label = set()
+    c = SYMBOLS.ids.get(const)
+    for fmla in formulas:
+        negated = fmla.startswith('~')
+        parts = SYMBOLS.atom(fmla[1:] if negated else fmla)
+        if parts and all(t == c for t in parts[1]):
+            label.add('~' * negated + SYMBOLS.names[parts[0]] + '(' + ','.join('*' * len(parts[1])) + ')')
+    return label
+
+def blocked_constants(branch):
+    '''Introduced constants whose label is covered by the label of an earlier unblocked constant'''
+    return set(blockers(branch))
+
+def blockers(branch):
+    '''Map each blocked constant to the earlier unblocked constant whose label covers its own'''
+    order = []
     for fmla in branch.formulas:
-        if is_literal(fmla):
+        for c in sorted(get_constants([fmla])):
+            if c not in order:
+                order.append(c)
+    blocked = {}
+    for i, c in enumerate(order):
+        if c not in branch.introduced:
             continue
-        current_priority = 1000
-
-        # Double negations
-        if fmla.startswith('~~'):
-            current_priority = 0
+        label = constant_label(branch.formulas, c)
+        for d in order[:i]:
+            if d not in blocked and label <= constant_label(branch.formulas, d):
+                blocked[c] = d
+                break
+    return blocked
 
-        # Negated quantifiers
-        elif fmla.startswith('~A') or fmla.startswith('~E'):
-            if len(fmla) > 2 and fmla[2] in ['x', 'y', 'z', 'w']:
-                current_priority = 1
+def is_blocked(fmla, blocked):
+    '''Check if every constant of the formula is blocked'''
+    constants = get_constants([fmla])
+    return bool(constants) and constants <= blocked
 
-        # Alpha rules
-        elif fmla.startswith('~('):
+def holds(fmla, domain, facts):
+    '''Evaluate a closed formula in the finite structure over domain in which exactly the atoms in facts are true'''
+    if is_fol_atom(fmla) or is_prop_atom(fmla):
+        return fmla in facts
+    if fmla.startswith('~'):
+        return not holds(fmla[1:], domain, facts)
+    var, body = SYMBOLS.quantifier(fmla)
+    if var:
+        instances = (holds(substitute(body, var, c), domain, facts) for c in domain)
+        return all(instances) if fmla[0] == 'A' else any(instances)
+    connective = con(fmla)
+    if connective == '&':
+        return holds(lhs(fmla), domain, facts) and holds(rhs(fmla), domain, facts)
+    if connective == '\\/':
+        return holds(lhs(fmla), domain, facts) or holds(rhs(fmla), domain, facts)
+    return not holds(lhs(fmla), domain, facts) or holds(rhs(fmla), domain, facts)
+
+def blocked_model(branch, blocked):
+    '''Check if the branch holds in the finite structure that reads each blocked constant as its blocker
+
+    The structure is made of the constants on the branch and its positive literals. A blocked existential only
+    has a witness in it if its blocker's witness serves, which need not be the case when relations between
+    constants matter, so the branch is only known to be satisfiable if this holds.
+    '''
+    domain = sorted({blocked.get(c, c) for c in get_constants(branch.formulas)})
+    if not domain:
+        return False
+    formulas = [rename_constants(f, blocked) for f in branch.formulas]
+    facts = {f for f in formulas if is_literal(f) and not f.startswith('~')}
+    return all(holds(f, domain, facts) for f in formulas)
+
+def signed_atoms(fmla, sign=1):
+    '''(atom, sign) pairs of the atom occurrences in a formula, sign 1 for positive and -1 for negative'''
+    if is_prop_atom(fmla) or is_fol_atom(fmla):
+        return {(fmla, sign)}
+    if fmla.startswith('~'):
+        return signed_atoms(fmla[1:], -sign)
+    var, body = SYMBOLS.quantifier(fmla)
+    if var:
+        return signed_atoms(body, sign)
+    connective = con(fmla)
+    if connective:
+        left_sign = -sign if connective == '->' else sign
+        return signed_atoms(lhs(fmla), left_sign) | signed_atoms(rhs(fmla), sign)
+    return set()
+
+def occurrence_signs(fmla):
+    '''(predicate, sign) pairs of the atoms in a formula, propositions keyed by name and predicates by id'''
+    return {(atom if is_prop_atom(atom) else SYMBOLS.atom(atom)[0], sign) for atom, sign in signed_atoms(fmla)}
+
+def prune_pure(branch, ctx):
+    '''Remove the non-literal formulas all of whose predicates occur with one sign only on the branch
+
+    Making every such predicate true (or false) everywhere keeps the other formulas satisfied, as they only
+    contain it with the same sign, and satisfies the removed ones, so satisfiability is unchanged.
+    '''
+    signs = {}
+    for fmla in branch.formulas:
+        for pred, sign in ctx.polarity(fmla):
+            signs[pred] = signs.get(pred, 0) | (1 if sign > 0 else 2)
+    pure = [f for f in branch.formulas
+            if not is_literal(f) and all(signs[pred] != 3 for pred, _ in ctx.polarity(f))]
+    for fmla in pure:
+        branch.remove_formula(fmla)
+    ctx.rule_counts['pure'] += len(pure)
+    return len(pure)
+
+# Key: formula, Value: priority of the rule expanding it, memoised as parse() is recursive
+RULE_PRIORITIES = {}
+SYMBOLS.memos.append(RULE_PRIORITIES)
+
+def rule_priority(fmla):
+    '''Priority of the rule expanding a non-literal formula, lower first: double negation 0, negated quantifier 1,
+    alpha 2, beta 10, delta 20, gamma 30, or 1000 if no rule applies'''
+    priority = RULE_PRIORITIES.get(fmla)
+    if priority is not None:
+        return priority
+    priority = 1000
+
+    # Double negations
+    if fmla.startswith('~~'):
+        priority = 0
+
+    # Negated quantifiers
+    elif fmla.startswith('~A') or fmla.startswith('~E'):
+        if SYMBOLS.quantifier(fmla[1:])[0]:
+            priority = 1
+
+    # Alpha rules
+    elif fmla.startswith('~('):
+        inner = fmla[1:]
+        conn = con(inner) if inner.startswith('(') else ''
+        if conn in ['->', '\\/']:
+            priority = 2
+    else:
+        p = parse(fmla)
+        if p in [5, 8] and con(fmla) == '&':
+            priority = 2
+
+    # Beta rules
+    if priority == 1000:
+        if fmla.startswith('~('):
             inner = fmla[1:]
             conn = con(inner) if inner.startswith('(') else ''
-            if conn in ['->', '\\/']:
-                current_priority = 2
+            if conn == '&':
+                priority = 10
         else:
             p = parse(fmla)
-            if p in [5, 8] and con(fmla) == '&':
-                current_priority = 2
-
-        # Beta rules
-        if current_priority == 1000:
-            if fmla.startswith('~('):
-                inner = fmla[1:]
-                conn = con(inner) if inner.startswith('(') else ''
-                if conn == '&':
-                    current_priority = 10
-            else:
-                p = parse(fmla)
-                if p in [5, 8] and con(fmla) in ['->', '\\/']:
-                    current_priority = 10
+            if p in [5, 8] and con(fmla) in ['->', '\\/']:
+                priority = 10
+
+    # Delta and gamma rules
+    if priority == 1000 and parse(fmla) == 4:
+        priority = 20
+    if priority == 1000 and parse(fmla) == 3:
+        priority = 30
+    if len(RULE_PRIORITIES) >= MEMO_LIMIT:
+        RULE_PRIORITIES.clear()
+    RULE_PRIORITIES[fmla] = priority
+    return priority
+
+def select_target_formula(branch, ctx=None):
+    '''Find the next formula to expand, priority: double negation > negated quantifiers > alpha > beta > delta > gamma
+
+    With ctx.relevance, gamma formulas whose missing instances cannot close the branch come last. With
+    ctx.strategy, the formulas are ranked by the Strategy instead.
+    '''
+    ctx = ctx or SearchContext()
+    target = None
+    priority = 1000 # lower number = higher priority
+    blocked = blocked_constants(branch) if ctx.blocking else set()
+    formulas = branch.formulas
+    for fmla in formulas:
+        if is_literal(fmla):
+            continue
+        current_priority = rule_priority(fmla)
 
-        # Delta rule
-        if current_priority == 1000 and parse(fmla) == 4:
-            current_priority = 20
+        # Delta rule — unless the existential belongs to blocked constants
+        if current_priority == 20 and is_blocked(fmla, blocked):
+            current_priority = 1000
 
         # Gamma rule — only if there is a new instantiation available
-        if current_priority == 1000 and parse(fmla) == 3:
-            var = fmla[1]
-            sub = fmla[2:]
-            constants = get_constants(branch.formulas) or {'a'}
-            for c in constants:
+        if current_priority == 30:
+            current_priority = 1000
+            for c in pending_constants(branch, fmla, ctx):
                 if not branch.has_gamma_instance(fmla, c):
-                    inst = substitute(sub, var, c)
-                    if inst not in branch.formulas:
-                        current_priority = 30
-                        break
+                    inst = ctx.instance(fmla, c)
+                    if not branch.has_formula(inst):
+                        if not ctx.relevance or ctx.relevant(branch, inst):
+                            current_priority = 30
+                            break
+                        current_priority = 40 # postponed until nothing else is left
 
+        if ctx.strategy and current_priority < 1000:
+            current_priority = ctx.strategy.priority(branch, fmla, current_priority)
         if current_priority < priority:
             priority = current_priority
             target = fmla
     return target
 
-def expand_tableau(branch):
+def expand_tableau(branch, ctx=None):
     '''Expand a formula in the branch'''
-    target = select_target_formula(branch)
+    ctx = ctx or SearchContext()
+    target = select_target_formula(branch, ctx)
     if target is None:
         return [branch]
-    p = parse(target)
+    rule, expanded = apply_rule(branch, target, ctx)
+    ctx.rule_counts[rule] += 1
+    if ctx.tracer:
+        ctx.tracer.rule(branch, rule, target, expanded)
+    if ctx.dependencies:
+        ctx.dependencies.rule(branch, rule, target, expanded)
+    return expanded
+
+def expand_linear(branch, ctx, bound=None):
+    '''Apply double negation, negated quantifier, alpha and delta steps to the branch in place until none is left
+
+    Stops once the branch closes, and leaves existentials alone once the branch has more than bound constants.
+    The formulas are scanned in passes that carry on past each step, until a pass applies none. Returns the
+    number of steps applied.
+    '''
+    steps = 0
+    applied = not branch.is_closed()
+    while applied:
+        applied = False
+        blocked = blocked_constants(branch) if ctx.blocking else set()
+        # A list branch appends what a step adds, so the pass reaches it; a bitset branch gives a snapshot
+        formulas = branch.formulas
+        i = 0
+        while i < len(formulas):
+            target = formulas[i]
+            priority = rule_priority(target) if work_kind(target) == 'rule' else 1000
+            grow = bound is None or len(branch.seen) <= bound
+            if not (priority < 10 or priority == 20 and grow and not is_blocked(target, blocked)):
+                i += 1
+                continue
+            # The tracer and dependency tracker compare a branch with its children, so they get a copy of the parent
+            parent = None
+            if ctx.tracer or ctx.dependencies:
+                parent = branch.copy()
+                parent.trace_id = branch.trace_id
+            rule, _ = apply_rule(branch, target, ctx, in_place=True)
+            ctx.rule_counts[rule] += 1
+            if ctx.tracer:
+                ctx.tracer.rule(parent, rule, target, [branch])
+            if ctx.dependencies:
+                ctx.dependencies.rule(parent, rule, target, [branch])
+            steps += 1
+            applied = True
+            if branch.is_closed():
+                return steps
+            if ctx.blocking:
+                blocked = blocked_constants(branch)
+            if i < len(formulas) and formulas[i] == target:
+                i += 1 # still in a snapshot
+    return steps
+
+def apply_rule(branch, target, ctx, in_place=False):
+    '''Expand the target formula and return the kind of rule applied with the new branches
+
+    With in_place, rules that do not branch change the branch itself rather than a copy.
+    '''
+    priority = rule_priority(target)
 
     # Double negation
     if target.startswith('~~'):
-        new_branch = branch.copy()
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
         new_branch.add_formula(target[2:])
-        return [new_branch]
+        return 'double_negation', [new_branch]
 
     # Replacing negated quantifiers
-    if target.startswith('~A') and len(target) > 2 and target[2] in ['x', 'y', 'z', 'w']:
-        new_branch = branch.copy()
+    var, sub = SYMBOLS.quantifier(target[1:])
+    if target.startswith('~A') and var:
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
-        var = target[2]
-        sub = target[3:]
         new_branch.add_formula(f"E{var}~{sub}")
-        return [new_branch]
+        return 'negated_quantifier', [new_branch]
 
-    if target.startswith('~E') and len(target) > 2 and target[2] in ['x', 'y', 'z', 'w']:
-        new_branch = branch.copy()
+    if target.startswith('~E') and var:
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
-        var = target[2]
-        sub = target[3:]
         new_branch.add_formula(f"A{var}~{sub}")
-        return [new_branch]
+        return 'negated_quantifier', [new_branch]
 
     inner = target[1:] if target.startswith('~') else target
     conn = con(inner) if inner.startswith('(') and inner.endswith(')') else ''
 
     # Alpha expansions
     if target.startswith('~(') and conn == '->':
-        new_branch = branch.copy()
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
         new_branch.add_formula(lhs(inner))
         new_branch.add_formula('~' + rhs(inner))
-        return [new_branch]
+        return 'alpha', [new_branch]
 
     if target.startswith('~(') and conn == '\\/':
-        new_branch = branch.copy()
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
         new_branch.add_formula('~' + lhs(inner))
         new_branch.add_formula('~' + rhs(inner))
-        return [new_branch]
+        return 'alpha', [new_branch]
 
-    if p in [5, 8] and conn == '&':
-        new_branch = branch.copy()
+    if priority == 2 and conn == '&':
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
         new_branch.add_formula(lhs(target))
         new_branch.add_formula(rhs(target))
-        return [new_branch]
+        return 'alpha', [new_branch]
 
     # Beta expansions
     if target.startswith('~(') and conn == '&':
@@ -391,108 +1539,703 @@ def expand_tableau(branch):
         b2 = branch.copy()
         b2.remove_formula(target)
         b2.add_formula('~' + rhs(inner))
-        return [b1, b2]
+        return 'beta', [b1, b2]
 
-    if p in [5, 8] and conn == '->':
+    if priority == 10 and conn == '->':
         b1 = branch.copy()
         b1.remove_formula(target)
         b1.add_formula('~' + lhs(target))
         b2 = branch.copy()
         b2.remove_formula(target)
         b2.add_formula(rhs(target))
-        return [b1, b2]
+        return 'beta', [b1, b2]
 
-    if p in [5, 8] and conn == '\\/':
+    if priority == 10 and conn == '\\/':
         b1 = branch.copy()
         b1.remove_formula(target)
         b1.add_formula(lhs(target))
         b2 = branch.copy()
         b2.remove_formula(target)
         b2.add_formula(rhs(target))
-        return [b1, b2]
+        return 'beta', [b1, b2]
 
     # Delta expansions
-    if p == 4:
-        var = target[1]
-        sub = target[2:]
-        new_branch = branch.copy()
+    if priority == 20:
+        var, sub = SYMBOLS.quantifier(target)
+        # Constants of the target itself are not fresh either
+        new_const = SYMBOLS.fresh_constant(branch.counts)
+        new_branch = branch if in_place else branch.copy()
         new_branch.remove_formula(target)
-        used = get_constants(new_branch.formulas)
-        for c in "abcdefghijklmnopqrstuvwxyz":
-            if c not in used:
-                new_const = c
-                break
         instance = substitute(sub, var, new_const)
         new_branch.add_formula(instance)
-        return [new_branch]
+        new_branch.introduced.append(new_const)
+        return 'delta', [new_branch]
 
     # Gamma expansions
-    if p == 3:
-        var = target[1]
-        sub = target[2:]
-        new_branch = branch.copy()
-        constants = get_constants(new_branch.formulas) or {'a'}
+    if priority == 30:
+        new_branch = branch if in_place else branch.copy()
+        constants = pending_constants(new_branch, target, ctx)
+        if ctx.relevance:
+            constants = relevant_constants(new_branch, target, constants, ctx)
         for c in constants:
             if not new_branch.has_gamma_instance(target, c):
-                inst = substitute(sub, var, c)
-                if inst not in new_branch.formulas:
+                inst = ctx.instance(target, c)
+                if not new_branch.has_formula(inst):
                     new_branch.add_formula(inst)
                     new_branch.add_gamma_instance(target, c)
-        return [new_branch]
-    return [branch]
+        if not ctx.relevance:
+            new_branch.mark(target, len(new_branch.seen))
+        return 'gamma', [new_branch]
+    return 'none', [branch]
+
+def pending_constants(branch, gamma_fmla, ctx):
+    '''Constants past the watermark of a gamma formula, moving the watermark over those already handled
+
+    Only constants that appeared since the formula was last instantiated are looked at, as in semi-naive
+    evaluation, so checking a saturated branch does not substitute anything.
+    '''
+    seen = branch.seen or ['a'] # the domain is never empty
+    mark = branch.watermarks.get(gamma_fmla, 0) if branch.seen else 0
+    while mark < len(seen) and (branch.has_gamma_instance(gamma_fmla, seen[mark])
+                                or branch.has_formula(ctx.instance(gamma_fmla, seen[mark]))):
+        mark += 1
+    if branch.seen:
+        branch.mark(gamma_fmla, mark)
+    return seen[mark:]
+
+def relevant_constants(branch, gamma_fmla, constants, ctx):
+    '''Constants whose missing instance can close the branch, or else the first missing one in name order'''
+    missing = [c for c in sorted(constants) if not branch.has_gamma_instance(gamma_fmla, c)
+               and not branch.has_formula(ctx.instance(gamma_fmla, c))]
+    relevant = [c for c in missing if ctx.relevant(branch, ctx.instance(gamma_fmla, c))]
+    return relevant or missing[:1]
 
 def theory(fmla):
     return [fmla]
 
-def sat(tableau):
-    '''Determine satisfiability of a formula using tableau method'''
+def branch_complete(branch, constants, blocked=(), ctx=None):
+    '''Check if only fully instantiated gamma formulas and blocked existentials are left to expand on the branch'''
+    ctx = ctx or SearchContext()
+    for f in branch.formulas:
+        if not is_literal(f):
+            if blocked and parse(f) == 4 and is_blocked(f, blocked):
+                continue
+            if parse(f) == 3:
+                if pending_constants(branch, f, ctx):
+                    return False
+            else:
+                return False
+    return True
+
+# Argument lists of atoms, the innermost bracketed parts of a formula
+ARGUMENTS = re.compile(r'\(([^()]*)\)')
+
+# Most orderings of introduced constants of the same colour tried by canonical_state()
+SYMMETRY_ORDERINGS = 120
+
+def rename_constants(fmla, names):
+    '''Rename the arguments of atoms that are keys of names, leaving propositions alone'''
+    return ARGUMENTS.sub(lambda m: '(' + ','.join(names.get(t, t) for t in m.group(1).split(',')) + ')', fmla)
+
+def symmetry_invariant(branch):
+    '''Formulas and gamma bookkeeping of a branch with every constant introduced by delta masked, the same for
+    branches equal up to renaming those constants'''
+    masked = {c: '#' for c in branch.introduced}
+    return (tuple(sorted(rename_constants(f, masked) for f in branch.formulas)),
+            tuple(sorted((rename_constants(g, masked), tuple(sorted(masked.get(c, c) for c in cs)))
+                         for g, cs in branch.gamma_instances.items())))
+
+def constant_colours(fresh, formulas):
+    '''Colour the introduced constants by the formulas they occur in, refined until the colours stop splitting
+
+    A constant starts with the formulas it occurs in, itself marked and the others masked, and each round it
+    adds the same with the others named by their colours, so constants along a chain of existentials end
+    up apart. Returns the colour classes in a canonical order.
+    '''
+    occurs = {c: [f for f in formulas if c in SYMBOLS.constants_of(f)] for c in fresh}
+    colours = {c: '#' for c in fresh}
+    classes = 1
+    while True:
+        signatures = {}
+        for c in fresh:
+            own = dict(colours, **{c: '*'})
+            signatures[c] = (colours[c], tuple(sorted(rename_constants(f, own) for f in occurs[c])))
+        ranked = sorted(set(signatures.values()))
+        index = {signature: i for i, signature in enumerate(ranked)}
+        colours = {c: f"#{index[signatures[c]]}" for c in fresh}
+        if len(ranked) == classes:
+            break
+        classes = len(ranked)
+    groups = [[] for _ in ranked]
+    for c in fresh:
+        groups[index[signatures[c]]].append(c)
+    return groups
+
+def canonical_state(branch, ctx):
+    '''Key of a branch that is the same for branches equal up to renaming the constants introduced by delta
+
+    Introduced constants are ordered by their colours (see constant_colours()), and only orderings of
+    constants of the same colour are tried, up to SYMMETRY_ORDERINGS of them. Gamma bookkeeping is part of
+    the key, and with blocking the order in which the constants were introduced is as well.
+    '''
+    fresh = [c for c in branch.introduced if c in branch.counts]
+    formulas = branch.formulas
+    groups = constant_colours(fresh, formulas) if fresh else []
+    orderings = itertools.islice(itertools.product(*(itertools.permutations(tied) for tied in groups)),
+                                 SYMMETRY_ORDERINGS)
+    best = None
+    for order in orderings:
+        names = {c: f"#{i}" for i, c in enumerate(itertools.chain.from_iterable(order))}
+        key = (tuple(sorted(rename_constants(f, names) for f in formulas)),
+               tuple(sorted((rename_constants(g, names), tuple(sorted(names.get(c, c) for c in cs)))
+                            for g, cs in branch.gamma_instances.items())),
+               tuple(names.get(c, c) for c in branch.introduced) if ctx.blocking else ())
+        if best is None or key < best:
+            best = key
+    return best
+
+def seen_symmetric(branch, seen, ctx):
+    '''Check if a branch equals one recorded in seen up to renaming introduced constants, recording it if not
+
+    seen maps the symmetry_invariant() of the branches recorded so far to [branch, canonical state] pairs.
+    Canonical states are only worked out once two branches share an invariant, and the branch is let go then.
+    '''
+    entries = seen.setdefault(symmetry_invariant(branch), [])
+    if not entries:
+        entries.append([branch, None])
+        return False
+    key = canonical_state(branch, ctx)
+    for entry in entries:
+        if entry[1] is None:
+            entry[0], entry[1] = None, canonical_state(entry[0], ctx)
+        if entry[1] == key:
+            return True
+    entries.append([None, key])
+    return False
+
+@scoped
+def sat(tableau, max_constants=None, options=None, **kwargs):
+    '''Determine satisfiability of a formula using tableau method, with SearchOptions given whole or as keywords'''
+    if options is None:
+        options = SearchOptions(**kwargs)
+    elif kwargs:
+        raise TypeError(f"sat() takes options or keyword options, not both: {', '.join(kwargs)}")
+    stats, trace, progress = options.stats, options.trace, options.progress
     if not tableau:
         return 0  # is not satisfiable
-
-    branches = [TableauBranch(branch) for branch in tableau]
+    source = [list(b if isinstance(b, list) else b.formulas) for b in tableau]
+
+    limit = MAX_CONSTANTS if max_constants is None else max_constants
+    bound = limit if options.initial_constants is None else min(options.initial_constants, limit)
+    dependencies = DependencyTracker() if options.backjumping else None
+    ctx = SearchContext(options.blocking, trace, dependencies, options.relevance, options.strategy)
+    closures = ClosureTable() if options.tabling is True else options.tabling or None
+    # States expanded in this search with their gamma bookkeeping, a second such branch is left to the first
+    expanded_states = set()
+    if options.compact:
+        table = FormulaTable()
+        def to_branch(b):
+            if isinstance(b, list):
+                return BitsetBranch(table, b)
+            return BitsetBranch(table, b.formulas, b.gamma_instances, b.introduced, b.deps, b.decisions)
+    else:
+        def to_branch(b):
+            return b if isinstance(b, TableauBranch) else TableauBranch(b)
+
+    def new_frontier():
+        return Frontier(options.frontier_limit, lambda data: to_branch(decode_branch(data)),
+                        spill_dir=options.spill_dir)
+
+    if stats is not None:
+        stats.update(rounds=0, peak_branches=0, peak_branch_bytes=0, peak_spilled=0, rules=ctx.rule_counts)
+        if options.checkpoint:
+            stats.update(checkpoints=0, checkpoint_seconds=0.0)
+
+    if options.resume and options.checkpoint and os.path.exists(options.checkpoint):
+        header, (branches, parked) = read_checkpoint(options.checkpoint, new_frontier)
+        if header['tableau'] != source:
+            raise ValueError(f"{options.checkpoint} was taken from a different tableau")
+        bound = header['bound']
+        ctx.rule_counts.update(header['rules'])
+        SYMBOLS.restore_fresh(header['constants'])
+        undetermined = header.get('undetermined', False)
+    else:
+        # Witnesses on branches handed in, e.g. by Theory, were declared by the search that introduced them
+        SYMBOLS.restore_fresh(c for b in tableau if not isinstance(b, list) for c in b.introduced)
+        if options.simplify:
+            tableau = simplify_tableau(tableau)
+            if not tableau:
+                return 0 # every branch simplified to a contradiction
+        branches = new_frontier()
+        # Pruning and in-place rules change branches, so the caller's own are left alone
+        initial = [to_branch(b if isinstance(b, list) else b.copy()) for b in tableau]
+        if dependencies:
+            dependencies.roots(initial)
+        branches.extend(initial)
+        parked = new_frontier()
+        undetermined = False
+    last_checkpoint = time.monotonic()
+    if progress:
+        progress.start(ctx.rule_counts, limit)
 
     while True:
-        new_branches = []
+        if options.checkpoint and time.monotonic() - last_checkpoint >= options.checkpoint_interval:
+            start = time.monotonic()
+            header = {'tableau': source, 'bound': bound, 'rules': ctx.rule_counts, 'constants': SYMBOLS.fresh,
+                      'undetermined': undetermined}
+            write_checkpoint(options.checkpoint, header, [branches, parked])
+            last_checkpoint = time.monotonic()
+            if stats is not None:
+                stats['checkpoints'] += 1
+                stats['checkpoint_seconds'] += last_checkpoint - start
+
+        new_branches = new_frontier()
         made_progress = False
+        # Branches in new_branches by their symmetry invariant, when reducing symmetric branches
+        symmetric = {}
+        if stats is not None:
+            stats['rounds'] += 1
+        if progress:
+            progress.new_round(len(branches), bound)
 
         for branch in branches:
-            if has_contradiction(branch.formulas):
+            if progress:
+                progress.tick(branch, len(new_branches), len(parked))
+            if dependencies and dependencies.pruned(branch):
+                ctx.rule_counts['backjumped'] += 1
                 continue
 
-            current = get_constants(branch.formulas)
-            if len(current) > MAX_CONSTANTS:
-                return 2 # may or may not be satisfiable
-
-            expanded = expand_tableau(branch)
-            if len(expanded) == 1 and expanded[0].formulas == branch.formulas:
-                branch_complete = True 
-                for f in branch.formulas:
-                    if not is_literal(f):
-                        if parse(f) == 3:
-                            constants = current or {'a'}
-                            var, sub = f[1], f[2:]
-                            for c in constants:
-                                if substitute(sub, var, c) not in branch.formulas:
-                                    branch_complete = False
-                                    break
-                        else:
-                            branch_complete = False
-                            break
-                if branch_complete:
+            if branch.is_closed():
+                if trace:
+                    trace.closed(branch)
+                if progress:
+                    progress.closed += 1
+                if closures:
+                    closures.close(frozenset(branch.formulas))
+                if dependencies and dependencies.closed(branch):
+                    return 0 # is not satisfiable
+                continue
+
+            if options.pure_literals:
+                prune_pure(branch, ctx)
+
+            if closures:
+                state = frozenset(branch.formulas)
+                if state in closures.open:
                     return 1 # is satisfiable
-            else:
+                if closures.subsumed(state):
+                    closures.close(state)
+                    ctx.rule_counts['tabled'] += 1
+                    continue
+                twin = (state, frozenset((g, frozenset(c)) for g, c in branch.gamma_instances.items()),
+                        tuple(branch.introduced))
+                if twin in expanded_states:
+                    ctx.rule_counts['tabled'] += 1
+                    continue
+
+            if options.linear and expand_linear(branch, ctx, bound) and branch.is_closed():
+                new_branches.append(branch) # closed on the next round
                 made_progress = True
+                continue
 
+            if len(branch.seen) > bound:
+                if bound >= limit:
+                    return 2 # may or may not be satisfiable
+                parked.append(branch)
+                continue
+
+            expanded = [branch] if branch.saturated() else expand_tableau(branch, ctx)
+            if expanded[0] is branch:
+                blocked = blockers(branch) if options.blocking else {}
+                if branch.saturated() or branch_complete(branch, branch.seen, set(blocked), ctx):
+                    if blocked and not branch_complete(branch, branch.seen, (), ctx) \
+                            and not blocked_model(branch, blocked):
+                        undetermined = True # open only because an existential was blocked
+                        continue
+                    if trace:
+                        trace.opened(branch)
+                    if closures and not options.blocking:
+                        closures.open.add(state)
+                    return 1 # is satisfiable
+            else:
+                made_progress = True
+                if closures:
+                    closures.expanded(state, [frozenset(b.formulas) for b in expanded])
+                    expanded_states.add(twin)
+
+            if options.symmetry:
+                kept = []
+                for b in expanded:
+                    if seen_symmetric(b, symmetric, ctx):
+                        ctx.rule_counts['symmetric'] += 1
+                    else:
+                        kept.append(b)
+                expanded = kept
             new_branches.extend(expanded)
 
+        if stats is not None:
+            if len(new_branches) > stats['peak_branches']:
+                stats['peak_branches'] = len(new_branches)
+                stats['peak_branch_bytes'] = sum(b.nbytes() for b in new_branches.memory)
+            stats['peak_spilled'] = max(stats['peak_spilled'], new_branches.spilled)
+
         if not new_branches:
-            return 0 # is not satisfiable
+            if not parked:
+                if undetermined:
+                    return 2 # may or may not be satisfiable
+                return 0 # is not satisfiable
+            bound = min(bound * 2, limit)
+            branches, parked = parked, new_frontier()
+            continue
         
         if not made_progress:
             return 1 # is satisfiable
 
         branches = new_branches
 
+#------------------------------------------------------------------------------------------------------------------------------:
+# Expansion Strategies
+
+# Key: strategy name, Value: Strategy instance
+STRATEGIES = {}
+
+def register_strategy(name):
+    '''Register an instance of a Strategy subclass under name, e.g. @register_strategy('delay_delta')'''
+    def register(cls):
+        STRATEGIES[name] = cls()
+        return cls
+    return register
+
+@register_strategy('default')
+class Strategy:
+    '''Ranks the formulas of a branch for select_target_formula(), which expands the lowest ranked one
+
+    priority() gets the rule priority of a formula (see rule_priority(), with 40 for a gamma formula postponed
+    by relevance) and returns its rank, ties going to the formula earliest on the branch. This base class
+    keeps the built-in order; subclasses change ranks or override priority() to look at the branch.
+    '''
+
+    # Key: rule priority, Value: rank
+    ranks = {0: 0, 1: 1, 2: 2, 10: 10, 20: 20, 30: 30, 40: 40}
+
+    def priority(self, branch, fmla, rule):
+        return self.ranks[rule]
+
+@register_strategy('delay_delta')
+class DelayDelta(Strategy):
+    '''Instantiate universals with the constants already there before introducing new ones'''
+
+    ranks = {**Strategy.ranks, 20: 35}
+
+@register_strategy('gamma_first')
+class GammaFirst(Strategy):
+    '''Add missing gamma instances before splitting, so they can close branches before they multiply'''
+
+    ranks = {**Strategy.ranks, 30: 5}
+
+@register_strategy('fewest_children')
+class FewestChildren(Strategy):
+    '''Take beta formulas whose alternatives close at once first, ranked by the children left open'''
+
+    def priority(self, branch, fmla, rule):
+        if rule != 10:
+            return self.ranks[rule]
+        return 10 + sum(not branch.has_formula(complement(child)) for child in beta_children(fmla))
+
+def beta_children(fmla):
+    '''The formulas the two branches of a beta formula add'''
+    if fmla.startswith('~('):
+        return '~' + lhs(fmla[1:]), '~' + rhs(fmla[1:])
+    if con(fmla) == '->':
+        return '~' + lhs(fmla), rhs(fmla)
+    return lhs(fmla), rhs(fmla)
+
+def complement(fmla):
+    return fmla[1:] if fmla.startswith('~') else '~' + fmla
+
+def get_strategy(strategy):
+    '''A Strategy given itself or by name, or None for the built-in order'''
+    if strategy is None or isinstance(strategy, Strategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown strategy {strategy!r}, expected one of {sorted(STRATEGIES)}")
+    return STRATEGIES[strategy]
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Simplification
+
+# Results of simplify_formula() for formulas that are true or false without any search
+TOP = '⊤'
+BOTTOM = '⊥'
+
+def negate(fmla):
+    '''Negation of a simplified formula, cancelling double negations and swapping TOP and BOTTOM'''
+    if fmla == TOP:
+        return BOTTOM
+    if fmla == BOTTOM:
+        return TOP
+    return fmla[1:] if fmla.startswith('~') else '~' + fmla
+
+def operands(fmla, connective):
+    '''Flatten a chain of one connective, e.g. ((A&B)&C) into [A, B, C] for &'''
+    if fmla.startswith('(') and con(fmla) == connective:
+        return operands(lhs(fmla), connective) + operands(rhs(fmla), connective)
+    return [fmla]
+
+def simplify_chain(fmla, connective):
+    '''Simplify a conjunction or disjunction, dropping repeated operands and folding complementary ones'''
+    unit, zero = (TOP, BOTTOM) if connective == '&' else (BOTTOM, TOP)
+    kept = []
+    for operand in operands(fmla, connective):
+        for s in operands(simplify_formula(operand), connective):
+            if s == zero:
+                return zero
+            if s != unit and s not in kept:
+                kept.append(s)
+    seen = set(kept)
+    if any(negate(s) in seen for s in kept):
+        return zero # A&~A or A\/~A
+    if not kept:
+        return unit
+    result = kept[-1]
+    for s in reversed(kept[:-1]):
+        result = '(' + s + connective + result + ')'
+    return result
+
+def simplify_formula(fmla):
+    '''Fold trivial tautologies and contradictions bottom up, returning TOP, BOTTOM or an equivalent formula'''
+    if fmla in [TOP, BOTTOM] or is_literal(fmla):
+        return fmla
+    if fmla.startswith('~'):
+        return negate(simplify_formula(fmla[1:]))
+    var, body = SYMBOLS.quantifier(fmla)
+    if var:
+        body = simplify_formula(body)
+        return body if body in [TOP, BOTTOM] else fmla[0] + var + body
+    connective = con(fmla)
+    if connective in ['&', '\\/']:
+        return simplify_chain(fmla, connective)
+    if connective == '->':
+        left, right = simplify_formula(lhs(fmla)), simplify_formula(rhs(fmla))
+        if left == right or left == BOTTOM or right == TOP:
+            return TOP
+        if left == TOP:
+            return right
+        if right == BOTTOM or right == negate(left):
+            return negate(left) # A->~A is ~A
+        return '(' + left + '->' + right + ')'
+    return fmla
+
+def simplify_tableau(tableau):
+    '''Simplify every formula of every branch, leaving out contradictory branches and formulas that are TOP'''
+    simplified = []
+    for b in tableau:
+        fmlas = [simplify_formula(f) for f in (b if isinstance(b, list) else b.formulas)]
+        if BOTTOM not in fmlas:
+            simplified.append([f for f in fmlas if f != TOP])
+    return simplified
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Parallel Search
+
+def explore_step(branch, max_constants, ctx):
+    '''Classify a branch as closed, capped or open, or expand it once and return its children'''
+    if branch.is_closed():
+        return 'closed', []
+    if len(branch.seen) > max_constants:
+        return 'capped', []
+    expanded = [branch] if branch.saturated() else expand_tableau(branch, ctx)
+    if expanded[0] is branch:
+        return 'open', []
+    return 'expanded', expanded
+
+def parallel_worker(tasks, pending, done, found, capped, max_constants):
+    '''Explore branches depth first, donating the oldest local branch whenever the shared queue runs dry'''
+    local = []
+    ctx = SearchContext()
+    while not done.is_set():
+        if not local:
+            try:
+                local.append(decode_branch(tasks.get(timeout=0.05)))
+            except queue.Empty:
+                continue
+        status, children = explore_step(local.pop(), max_constants, ctx)
+        if status == 'open':
+            found.value = 1
+            done.set()
+            return
+        if status == 'capped':
+            capped.value = 1
+        local.extend(children)
+        with pending.get_lock():
+            pending.value += len(children) - 1
+            if pending.value == 0:
+                done.set()
+                return
+        if len(local) > 1 and tasks.empty():
+            tasks.put(encode_branch(local.pop(0)))
+
+# Seconds between checks that the parallel workers are still alive
+PARALLEL_POLL = 0.1
+
+@scoped
+def sat_parallel(tableau, workers=None, max_constants=None):
+    '''Determine satisfiability by sharing open branches between worker processes'''
+    if not tableau:
+        return 0  # is not satisfiable
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return sat(tableau, max_constants)
+    max_constants = MAX_CONSTANTS if max_constants is None else max_constants
+
+    # Workers are forked so they do not re-import this module and rerun the driver below
+    mp = multiprocessing.get_context('fork')
+    tasks = mp.Queue()
+    SYMBOLS.restore_fresh(c for b in tableau if not isinstance(b, list) for c in b.introduced)
+    branches = [b if isinstance(b, TableauBranch) else TableauBranch(b) for b in tableau]
+    for branch in branches:
+        tasks.put(encode_branch(branch))
+    pending = mp.Value('i', len(branches))
+    found = mp.Value('b', 0, lock=False)
+    capped = mp.Value('b', 0, lock=False)
+    done = mp.Event()
+
+    procs = [mp.Process(target=parallel_worker, args=(tasks, pending, done, found, capped, max_constants), daemon=True)
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    # A worker that dies, e.g. killed or out of memory, never sets done and leaves its branch unfinished
+    died = False
+    while not done.wait(PARALLEL_POLL):
+        if any(not proc.is_alive() for proc in procs) and not done.is_set():
+            died = True
+            break
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+    tasks.cancel_join_thread()
+    if died:
+        logger.warning("a parallel worker exited early, searching sequentially")
+        return sat(tableau, max_constants)
+
+    if found.value:
+        return 1 # is satisfiable
+    if capped.value:
+        return 2 # may or may not be satisfiable
+    return 0 # is not satisfiable
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Solver Engines
+
+# Key: engine name, Value: function taking a tableau and budgets and returning (verdict, stats)
+ENGINES = {}
+
+logger = logging.getLogger('tableau')
+
+def register_engine(name):
+    '''Register a solver engine under name, e.g. @register_engine('dfs')'''
+    def register(engine):
+        ENGINES[name] = engine
+        return engine
+    return register
+
+@register_engine('reference')
+def reference_engine(tableau, max_constants=None):
+    '''The breadth-first tableau of sat()'''
+    stats = {}
+    return sat(tableau, max_constants, stats=stats), stats
+
+@register_engine('compact')
+def compact_engine(tableau, max_constants=None):
+    '''sat() over bitset branches'''
+    stats = {}
+    return sat(tableau, max_constants, compact=True, stats=stats), stats
+
+@register_engine('parallel')
+def parallel_engine(tableau, max_constants=None):
+    '''sat_parallel() on every core'''
+    return sat_parallel(tableau, max_constants=max_constants), {}
+
+def solve(tableau, engine='reference', **budgets):
+    '''Run a registered engine and return its verdict and stats'''
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+    return ENGINES[engine](tableau, **budgets)
+
+def differential_sat(tableau, engine, sample=1.0, rng=random, **budgets):
+    '''Answer with engine, and on a sample of calls also run the reference engine and log any disagreement'''
+    verdict, stats = solve(tableau, engine, **budgets)
+    if engine != 'reference' and rng.random() < sample:
+        expected, _ = solve(tableau, 'reference', **budgets)
+        if verdict != expected:
+            logger.warning("engine %s disagrees with reference on %s: %d != %d", engine, tableau, verdict, expected)
+    return verdict
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# Entailment Queries
+
+@scoped
+def saturate(tableau, max_constants=None):
+    '''Expand every branch until it closes, saturates or exceeds max_constants, and return the branches left open'''
+    max_constants = MAX_CONSTANTS if max_constants is None else max_constants
+    branches = [b if isinstance(b, TableauBranch) else TableauBranch(b) for b in tableau]
+    ctx = SearchContext()
+    done = []
+    while branches:
+        new_branches = []
+        for branch in branches:
+            if branch.is_closed():
+                continue
+            if len(branch.seen) > max_constants:
+                done.append(branch) # left for sat() to report as undetermined
+                continue
+            expanded = [branch] if branch.saturated() else expand_tableau(branch, ctx)
+            if expanded[0] is branch:
+                done.append(branch)
+                continue
+            new_branches.extend(expanded)
+        branches = new_branches
+    return done
+
+def check_formula(fmla):
+    '''Raise ValueError unless parse() accepts fmla'''
+    if not isinstance(fmla, str) or not parse(fmla):
+        raise ValueError(f"{fmla!r} is not a formula")
+
+class Theory:
+    '''A list of formulas whose tableau is expanded once and reused by every query'''
+
+    def __init__(self, fmlas, max_constants=None):
+        self.fmlas = list(fmlas)
+        for fmla in self.fmlas:
+            check_formula(fmla)
+        self.max_constants = max_constants
+        self.branches = saturate([TableauBranch(self.fmlas.copy())], max_constants)
+
+    def query(self, fmla):
+        '''Satisfiability of the theory together with fmla, continuing from the cached open branches'''
+        check_formula(fmla)
+        extended = []
+        for branch in self.branches:
+            new_branch = branch.copy()
+            new_branch.add_formula(fmla)
+            extended.append(new_branch)
+        return sat(extended, self.max_constants)
+
+    def entails(self, fmla):
+        '''Return 1 if the theory entails fmla, 0 if it does not and 2 if this cannot be decided'''
+        check_formula(fmla)
+        return [1, 0, 2][self.query('~' + fmla)]
+
+def entails(fmlas, fmla):
+    '''Return 1 if the formulas entail fmla, 0 if they do not and 2 if this cannot be decided'''
+    return Theory(fmlas).entails(fmla)
+
+def valid(fmla):
+    '''Return 1 if fmla is valid, 0 if it is not and 2 if this cannot be decided'''
+    return Theory([]).entails(fmla)
+
 #------------------------------------------------------------------------------------------------------------------------------:
 #                                            DO NOT MODIFY THE CODE BELOW THIS LINE!                                           :
 #------------------------------------------------------------------------------------------------------------------------------:
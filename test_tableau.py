@@ -925,6 +925,1152 @@ def test_sat_edge_cases():
     
     print_pass("Edge cases: ALL TESTS PASSED")
 
+def test_sat_constant_budget():
+    print_test_header("sat() - Constant Budget")
+
+    print_section("Per-call limit:")
+    fmla = '(AxEyP(x,y)&EzQ(z,z))'
+    beq(sat([[fmla]], max_constants=1), 2, "Tight limit is undetermined")
+    beq(sat([[fmla]], max_constants=3, initial_constants=None), 2, "Fixed cutoff still supported")
+    beq(sat([['(ExP(x,x)&EyQ(y,y))']], max_constants=1), 2, "Two witnesses exceed a limit of one")
+    beq(sat([['(ExP(x,x)&EyQ(y,y))']], max_constants=2), 1, "Two witnesses fit a limit of two")
+    print_pass("max_constants is respected")
+
+    print_section("Iterative deepening:")
+    # The left disjunct never saturates, the right one is open after a long chain of negations
+    fmla = '((AxEyP(x,y)&EzQ(z,z))\\/' + '~' * 80 + 'q)'
+    beq(sat([[fmla]], initial_constants=None), 2, "Fixed cutoff gives up on the runaway branch")
+    for bad in [0, -1]:
+        try:
+            sat([['(ExP(x,x)&EyQ(y,y))']], initial_constants=bad)
+            assert False, f"initial_constants={bad} should be rejected"
+        except ValueError:
+            pass
+    beq(sat([[fmla]]), 1, "Small first bound finds the open branch")
+    for fmla in ['(ExP(x,x)&Ax(~P(x,x)->P(x,x)))', '(Ax(P(x,x)&~P(x,x))&ExQ(x,x))',
+                 'ExEy((Q(x,x)&Q(y,y))\\/~P(y,y))', 'ExAx(P(x,x)&~P(x,x))']:
+        beq(sat([[fmla]], initial_constants=1), sat([[fmla]], initial_constants=None), fmla)
+    print_pass("Deepening agrees with the fixed cutoff on decided inputs")
+
+    print_pass("Constant budget: ALL TESTS PASSED")
+
+def test_sat_blocking():
+    print_test_header("sat() - Blocking")
+
+    print_section("Labels and blocked constants:")
+    beq(constant_label(['P(a,a)', '~Q(a,a)', 'R(a,b)', 'S(b,b)'], 'a'), {'P(*,*)', '~Q(*,*)'}, "Label of a")
+    b = TableauBranch(['Q(a,a)', 'AxEyP(x,y)', 'P(a,b)', 'EyP(b,y)'], introduced=['a', 'b'])
+    beq(blocked_constants(b), {'b'}, "b repeats a and is blocked")
+    b = TableauBranch(['Q(a,a)', 'P(a,b)', 'R(b,b)'], introduced=['a', 'b'])
+    beq(blocked_constants(b), set(), "b has a literal a lacks")
+    b = TableauBranch(['Q(a,a)', 'P(a,b)', 'EyP(b,y)'])
+    beq(blocked_constants(b), set(), "Input constants are never blocked")
+    print_pass("Blocked constants identified")
+
+    print_section("Blocked existentials are not expanded:")
+    b = TableauBranch(['Q(a,a)', 'P(a,b)', 'EyP(b,y)'], introduced=['a', 'b'])
+    assert select_target_formula(b, SearchContext(blocking=True)) is None, "Nothing left to expand"
+    beq(select_target_formula(b), 'EyP(b,y)', "Delta applies without blocking")
+    print_pass("Delta rule respects blocking")
+
+    print_section("Verdicts:")
+    beq(sat([['(AxEyP(x,y)&EzQ(z,z))']]), 2, "Runs into the constant limit without blocking")
+    beq(sat([['(AxEyP(x,y)&EzQ(z,z))']], blocking=True), 1, "Repeating structure is satisfiable")
+    beq(sat([['(AxEy(Q(x,x)->(P(y,y)&R(x,y)))&~Ax(Q(x,x)->Ey(P(y,y)&R(x,y))))']], blocking=True), 0,
+        "Unsatisfiable input still closes")
+    for fmla in ['(ExP(x,x)&Ax(~P(x,x)->P(x,x)))', '(Ax(P(x,x)&~P(x,x))&ExQ(x,x))', 'ExAy(Q(x,x)->P(y,y))']:
+        beq(sat([[fmla]], blocking=True), sat([[fmla]]), fmla)
+    fmla = '((AxEyP(x,y)&AxAy(P(x,y)->Az(P(y,z)->Q(z,z))))&Ax~Q(x,x))'
+    beq(sat([[fmla]], blocking=True), 2, "Blocked witness that does not serve is undetermined")
+    beq(sat([[fmla]], blocking=True, compact=True), 2, "Same with compact branches")
+    print_pass("Blocking verdicts")
+
+    print_section("Models with blocked constants:")
+    b = TableauBranch(['AxEyP(x,y)', 'P(a,b)', 'EyP(b,y)'], introduced=['a', 'b'])
+    beq(blocked_model(b, {'b': 'a'}), True, "b reads as a, so P(a,a) gives a its witness")
+    b = TableauBranch(['AxEyP(x,y)', 'P(a,b)', '~P(b,a)', 'EyP(b,y)'], introduced=['a', 'b'])
+    beq(blocked_model(b, {'b': 'a'}), False, "~P(b,a) reads as ~P(a,a)")
+    beq(holds('AxEy(P(x,y)&~P(y,x))', ['a', 'b'], {'P(a,b)', 'P(b,a)'}), False, "Evaluates quantifiers")
+    print_pass("Blocked branches checked against a finite model")
+
+    print_pass("Blocking: ALL TESTS PASSED")
+
+def test_bitset_branch():
+    print_test_header("BitsetBranch")
+
+    print_section("Formula table:")
+    table = FormulaTable()
+    i = table.intern('P(a,b)')
+    beq(table.intern('P(a,b)'), i, "Interning is stable")
+    beq(table.complement_bits[i], 1 << table.ids['~P(a,b)'], "Literal knows its complement")
+    beq(table.complement_bits[table.intern('(p&q)')], 0, "Non-literals have no complement")
+    print_pass("Formula IDs and complements")
+
+    print_section("Branch operations:")
+    b = BitsetBranch(table, ['p', '(p&q)'])
+    assert b.has_formula('p') and not b.has_formula('q'), "Membership is a bit test"
+    c = b.copy()
+    c.remove_formula('(p&q)')
+    c.add_formula('q')
+    assert b.has_formula('(p&q)') and not b.has_formula('q'), "Copies are independent"
+    beq(sorted(c.formulas), ['p', 'q'], "Formulas decoded from bits")
+    assert not c.is_closed(), "No contradiction"
+    c.add_formula('~q')
+    assert c.is_closed(), "Contradiction found with one AND"
+    c.remove_formula('~q')
+    assert not c.is_closed(), "Removing a literal reopens the branch"
+    r = expand_tableau(BitsetBranch(table, ['(p\\/q)', 'r']))
+    beq([sorted(x.formulas) for x in r], [['p', 'r'], ['q', 'r']], "Beta expansion on bitsets")
+    import sys
+    for b in [TableauBranch(['AxP(x,x)', 'P(a,b)']), BitsetBranch(table, ['AxP(x,x)', 'P(a,b)'])]:
+        before = b.nbytes()
+        b.deps = {f: frozenset({(0, 0)}) for f in b.formulas}
+        assert b.nbytes() > before, "Dependency labels are counted"
+        assert b.nbytes() > sys.getsizeof(b.counts) + sys.getsizeof(b.seen), "Constant counts are counted"
+    print_pass("Bitset branches behave like list branches")
+
+    print_section("Compact sat():")
+    for fmla in ['((p\\/q)&(~p\\/~q))', '(q&~(p\\/~p))', '~~~~~~~~~~~q', 'ExAx(P(x,x)&~P(x,x))',
+                 '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))', '(AxEyP(x,y)&EzQ(z,z))', 'ExAy(Q(x,x)->P(y,y))']:
+        beq(sat([[fmla]], compact=True), sat([[fmla]]), fmla)
+    stats = {}
+    sat([['((p\\/q)&(~p\\/~q))']], compact=True, stats=stats)
+    assert stats['peak_branches'] == 4 and stats['peak_branch_bytes'] > 0, "Branch memory reported"
+    print_pass("Compact verdicts agree with list branches")
+
+    print_pass("BitsetBranch: ALL TESTS PASSED")
+
+def test_frontier():
+    print_test_header("Frontier")
+
+    print_section("Spilling to disk:")
+    f = Frontier(limit=2, batch=2)
+    branches = [TableauBranch(['p', 'AxP(x,x)'], {'AxP(x,x)': {'a'}}, ['a']), TableauBranch(['q']),
+                TableauBranch(['(r&s)', '~p']), TableauBranch([]), TableauBranch(['P(a,b)'])]
+    f.extend(branches)
+    beq(len(f), 5, "All branches counted")
+    beq(len(f.memory), 2, "Only the limit is kept in memory")
+    beq(f.spilled, 3, "The rest is spilled")
+    back = list(f)
+    beq([b.formulas for b in back], [b.formulas for b in branches], "Order and formulas preserved")
+    beq(back[0].gamma_instances, {'AxP(x,x)': {'a'}}, "Gamma instances preserved")
+    beq(back[0].introduced, ['a'], "Introduced constants preserved")
+    beq((len(f), list(f)), (0, []), "Reading takes the branches out")
+    f.extend(branches[:3])
+    beq([b.formulas for b in f], [b.formulas for b in branches[:3]], "Refilled after reading")
+    print_pass("Frontier spills and reloads branches")
+
+    print_section("Bounded sat():")
+    for fmla in ['(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))', '((p\\/q)&((p->~p)&(~p->p)))',
+                 '((p\\/q)&(~p\\/~q))', '(AxEyP(x,y)&EzQ(z,z))', 'ExEy((Q(x,x)&Q(y,y))\\/~P(y,y))']:
+        beq(sat([[fmla]], frontier_limit=1), sat([[fmla]]), fmla)
+        beq(sat([[fmla]], frontier_limit=1, compact=True), sat([[fmla]]), fmla + " (compact)")
+    stats = {}
+    sat([['(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))']], frontier_limit=2, stats=stats)
+    assert stats['peak_spilled'] > 0, "Branches were spilled"
+    print_pass("Spilling frontier keeps verdicts")
+
+    print_pass("Frontier: ALL TESTS PASSED")
+
+def test_gamma_instance_cache():
+    print_test_header("SearchContext - Gamma Instance Cache")
+
+    ctx = SearchContext()
+    i1 = ctx.instance('Ax(P(x,x)->Q(x,y))', 'a')
+    beq(i1, '(P(a,a)->Q(a,y))', "Instance matches substitute()")
+    assert ctx.instance('Ax(P(x,x)->Q(x,y))', 'a') is i1, "Repeated lookups return the cached instance"
+    assert ctx.instance('Az(P(z,z)->Q(z,y))', 'a') is i1, "Identical instances share one object"
+    beq(len(ctx.instances), 2, "One entry per (formula, constant)")
+    print_pass("Instances computed once and shared")
+
+    ctx = SearchContext()
+    b = TableauBranch(['P(a,a)', 'Q(b,b)', 'AxR(x,x)'])
+    r1 = expand_tableau(b, ctx)
+    r2 = expand_tableau(b.copy(), ctx)
+    beq(len(ctx.instances), 2, "Sibling expansions reuse the cache")
+    assert {f for f in r1[0].formulas} == {f for f in r2[0].formulas}, "Same expansion"
+    print_pass("Cache is shared across branches of a run")
+
+    print_pass("Gamma instance cache: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# ENTAILMENT TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_theory_entailment():
+    print_test_header("Theory - Entailment and Validity")
+
+    print_section("Entailment:")
+    t = Theory(['(p->q)', 'p'])
+    assert t.entails('q') == 1, "Modus ponens"
+    assert t.entails('p') == 1, "Theory member is entailed"
+    assert t.entails('r') == 0, "Unrelated atom not entailed"
+    assert t.entails('~q') == 0, "Negated consequence not entailed"
+    assert entails(['AxP(x,x)'], 'P(a,a)') == 1, "Universal instance is entailed"
+    assert entails(['ExP(x,x)'], 'AxP(x,x)') == 0, "Existential does not entail universal"
+    print_pass("Entailment queries answered from one expansion")
+
+    print_section("Cached branches are reused:")
+    t = Theory(['(p\\/q)', '(r\\/s)'])
+    before = [b.formulas.copy() for b in t.branches]
+    assert t.entails('(p\\/q)') == 1
+    assert t.entails('p') == 0
+    beq([b.formulas for b in t.branches], before, "Queries leave the cached tableau untouched")
+    print_pass("Queries only extend copies of the open branches")
+
+    print_section("Inconsistent theory and validity:")
+    assert Theory(['p', '~p']).entails('q') == 1, "Inconsistent theory entails everything"
+    assert valid('(p->p)') == 1, "p->p is valid"
+    assert valid('(p\\/~p)') == 1, "Excluded middle is valid"
+    assert valid('p') == 0, "p is not valid"
+    assert valid('(AxP(x,x)->P(a,a))') == 1, "Universal instantiation is valid"
+    for bad in [lambda: valid('(p'), lambda: entails([], '(p'), lambda: Theory(['p', 'p)']), lambda: Theory([]).query('')]:
+        try:
+            bad()
+            assert False, "Strings that are not formulas are rejected"
+        except ValueError:
+            pass
+    print_pass("Validity checks work")
+
+    print_pass("Entailment: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# PARALLEL TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_sat_parallel():
+    print_test_header("sat_parallel()")
+
+    print_section("Branch serialisation:")
+    b = TableauBranch(['AxP(x,x)', 'P(a,a)', '(p\\/q)'], {'AxP(x,x)': {'a', 'b'}})
+    r = decode_branch(encode_branch(b))
+    beq(r.formulas, b.formulas, "Formulas survive a round trip")
+    beq(r.gamma_instances, b.gamma_instances, "Gamma instances survive a round trip")
+    beq(decode_branch(encode_branch(TableauBranch([]))).formulas, [], "Empty branch round trip")
+    print_pass("Branches serialise compactly")
+
+    print_section("Verdicts match sat():")
+    for fmla in ['((p\\/q)&(~p\\/~q))', '(q&~(p\\/~p))', '((p\\/q)&((p->~p)&(~p->p)))',
+                 'ExAx(P(x,x)&~P(x,x))', '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))',
+                 '(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))']:
+        beq(sat_parallel([[fmla]], workers=2), sat([[fmla]]), fmla)
+    assert sat_parallel([], workers=2) == 0, "Empty tableau is UNSAT"
+    assert sat_parallel([['(AxEyP(x,y)&EzQ(z,z))']], workers=2) in [1, 2], "Constant limit is respected"
+    print_pass("Parallel verdicts agree with sat()")
+
+    print_section("Dead workers:")
+    import os
+    import tableau
+    worker = tableau.parallel_worker
+    tableau.parallel_worker = lambda *args: os._exit(1)
+    try:
+        beq(sat_parallel([['((p\\/q)&(~p\\/~q))']], workers=2), 1, "Falls back to sat() when workers die")
+        beq(sat_parallel([['(q&~(p\\/~p))']], workers=2), 0, "UNSAT is still found")
+    finally:
+        tableau.parallel_worker = worker
+    print_pass("sat_parallel does not wait on dead workers")
+
+    print_pass("sat_parallel: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# SERVER TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_solver_server():
+    print_test_header("SolverServer")
+    import asyncio
+    import json
+    from server_tableau import SolverServer
+
+    async def session():
+        server = SolverServer(workers=2, max_pending=2)
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            requests = [{'id': 1, 'formula': '(p->p)', 'mode': 'sat'},
+                        {'id': 2, 'formula': '~(p->p)'},
+                        {'id': 3, 'formula': '(p&q)', 'mode': 'parse'},
+                        {'id': 4, 'formula': '(p~q)', 'mode': 'sat'},
+                        {'id': 5, 'formula': '(AxEyP(x,y)&EzQ(z,z))', 'budget': 5}]
+            for request in requests:
+                writer.write((json.dumps(request) + '\n').encode())
+            await writer.drain()
+            responses = {}
+            for _ in requests:
+                response = json.loads(await reader.readline())
+                responses[response['id']] = response['result']
+            writer.write(b'{"mode": "stats", "id": 6}\n')
+            await writer.drain()
+            stats = json.loads(await reader.readline())
+            errors = []
+            for line in [b'[1, 2]\n', b'{"id": 7, "formula": "p", "budget": "abc"}\n',
+                         b'{"id": 8, "formula": "p", "budget": -1}\n', b'{"id": 9, "formula": "(p&q)"}\n']:
+                writer.write(line)
+                await writer.drain()
+                errors.append(json.loads(await reader.readline()))
+            writer.close()
+            return responses, stats, errors
+        finally:
+            listener.close()
+            server.close()
+
+    responses, stats, errors = asyncio.run(session())
+    beq(responses[1], '(p->p) is satisfiable.', "SAT verdict wording")
+    beq(responses[2], '~(p->p) is not satisfiable.', "UNSAT verdict wording")
+    beq(responses[3], '(p&q) is a binary connective propositional formula. Its left hand side is p, '
+                      'its connective is &, and its right hand side is q.', "PARSE wording")
+    beq(responses[4], '(p~q) is not a formula.', "Rejects non-formulas")
+    assert responses[5].endswith('satisfiable.'), "Budgeted request answers"
+    beq(stats['completed'], 5, "Stats count completed requests")
+    assert stats['p99_ms'] >= stats['p50_ms'] > 0, "Latency percentiles reported"
+    print_pass("Requests answered in the driver's vocabulary")
+
+    print_section("Bad requests:")
+    beq(errors[0], {'error': 'expected a JSON object'}, "Rejects JSON that is not an object")
+    assert 'error' in errors[1] and errors[1]['id'] == 7, "Rejects a budget that is not a number"
+    assert 'error' in errors[2] and errors[2]['id'] == 8, "Rejects a negative budget"
+    beq(errors[3].get('result'), '(p&q) is satisfiable.', "Connection still serves requests")
+    print_pass("Bad requests get an error response")
+
+    print_section("Dead workers:")
+    import os
+    import signal
+
+    async def killed():
+        server = SolverServer(workers=2, max_pending=2)
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            for pid in list(server.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = []
+            for i in range(3):
+                writer.write((json.dumps({'id': i, 'formula': '(p&~p)'}) + '\n').encode())
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            return responses
+        finally:
+            listener.close()
+            server.close()
+
+    for response in asyncio.run(killed()):
+        beq(response.get('result'), '(p&~p) is not satisfiable.', "Answered after the workers were killed")
+    print_pass("A broken pool is replaced")
+
+    print_pass("SolverServer: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# BULK PARSING TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_parse_lines():
+    print_test_header("parse_lines()")
+    import tableau
+
+    lines = ['~(p->(q->p))', '((p\\/q)&', '(p~q)', 'p', '', ' p', 'p ', 'p\tq', '(p&q))', ')(p&q)(',
+             'T(x,y)', 'P(x,y)', '~~~~', 'P(x,y,z)', 'AxP(x,x)', 'Ax', 'é', '((p&q)', '(AxP(x,x)->ExQ(x,y))',
+             'ExEy((Q(x,x)&Q(y,y))\\/', '(Q(x,x)~(P(y,y))', '(p&q)']
+
+    print_section("Pre-validation:")
+    expected = [plausible_formula(line) for line in lines]
+    beq(prevalidate(lines), expected, "Bulk check matches the per-line check")
+    for line, ok in zip(lines, expected):
+        if parse(line):
+            assert ok, f"{line} is a formula and must pass"
+    assert not plausible_formula('(p&q))'), "Unbalanced rejected"
+    assert not plausible_formula('p q'), "Whitespace rejected"
+    assert not plausible_formula('T(x,y)'), "Illegal character rejected"
+    print_pass("Only non-formulas are flagged")
+
+    print_section("Results match parse():")
+    beq(parse_lines(lines), [parse(line) for line in lines], "parse_lines")
+    beq(parse_lines(lines, block=3), [parse(line) for line in lines], "parse_lines in small blocks")
+    beq(parse_lines([]), [], "No lines")
+    beq(parse_lines(['', '']), [0, 0], "Only empty lines")
+    np = tableau.np
+    tableau.np = None
+    try:
+        beq(parse_lines(lines), [parse(line) for line in lines], "Pure Python fallback")
+    finally:
+        tableau.np = np
+    print_pass("Bulk parsing agrees with parse()")
+
+    print_pass("parse_lines: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# TRACING TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_tracer():
+    print_test_header("Tracer")
+    import io
+    import json
+    from trace_tableau import summarise, subtree_sizes
+
+    print_section("Rule events:")
+    out = io.StringIO()
+    t = Tracer(out)
+    beq(sat([['((p\\/q)&(~p\\/~q))']], trace=t), 1, "Tracing does not change the verdict")
+    t.dump()
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    events, formulas = lines[:-1], lines[-1]['f']
+    rules = [e for e in events if e['e'] == 'rule']
+    beq([e['r'] for e in rules], ['alpha', 'beta', 'beta', 'beta'], "One event per rule application")
+    beq(formulas[rules[0]['t']], '((p\\/q)&(~p\\/~q))', "Target given by formula id")
+    beq(sorted(formulas[i] for i in rules[0]['n'][0]), ['(p\\/q)', '(~p\\/~q)'], "New formulas given by id")
+    beq(rules[1]['p'], rules[0]['b'], "Parent ids link the tree")
+    assert any(e['e'] == 'close' for e in events), "Closures recorded"
+    assert events[-1]['e'] == 'open', "Open branch recorded"
+    print_pass("Rule applications traced")
+
+    print_section("Sampling and ring buffer:")
+    t = Tracer(sample=0.0, ring=10)
+    sat([['((p\\/q)&(~p\\/~q))']], trace=t)
+    beq(len(t.ring), 0, "Sampling drops events")
+    t = Tracer(ring=2)
+    sat([['((p\\/q)&(~p\\/~q))']], trace=t)
+    beq(len(t.ring), 2, "Ring buffer keeps the latest events")
+    print_pass("Sampling and ring buffer")
+
+    print_section("Analysis:")
+    beq(subtree_sizes(events)[rules[0]['b']], 8, "Subtree of the root")
+    summary = summarise(events, formulas)
+    beq(summary['rules'], {'alpha': 1, 'beta': 3}, "Rule counts")
+    beq(summary['hot_formulas'][0], ('(~p\\/~q)', 2), "Hottest formula")
+    beq(summary['largest_subtrees'][0][1], 8, "Largest subtree first")
+    print_pass("Trace summary")
+
+    print_pass("Tracer: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# BENCHMARK TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_regression_tracker():
+    print_test_header("Benchmark Regression Tracker")
+    from bench_tableau import mann_whitney_p, compare, measure
+
+    print_section("Mann-Whitney U test:")
+    assert mann_whitney_p([10, 11, 12, 13, 14], [1, 2, 3, 4, 5]) < 0.01, "Clearly slower"
+    assert mann_whitney_p([1, 2, 3, 4, 5], [10, 11, 12, 13, 14]) > 0.99, "Clearly faster"
+    assert 0.2 < mann_whitney_p([1, 3, 5, 7], [2, 4, 6, 8]) < 0.8, "Interleaved samples"
+    beq(mann_whitney_p([1, 1, 1], [1, 1, 1]), 1.0, "All ties")
+    print_pass("Slowdown test")
+
+    print_section("Baseline comparison:")
+    stats = {}
+    sat([['((p\\/q)&(~p\\/~q))']], stats=stats)
+    beq(dict(stats['rules']), {'alpha': 1, 'beta': 3}, "Rule applications counted")
+    results = measure([('prop', '(p->p)'), ('fol', 'ExP(x,x)')], 3, {})
+    beq(compare(results, results), {}, "No regressions against itself")
+    slower = {f: dict(r, samples=[s * 10 for s in r['samples']] * 3, median=r['median'] * 10)
+              for f, r in results.items()}
+    beq(sorted(compare(slower, {f: dict(r, samples=r['samples'] * 3) for f, r in results.items()})),
+        ['fol', 'prop'], "Slowdowns reported per family")
+    fewer = {f: dict(r, rules=r['rules'] - 1) for f, r in results.items()}
+    beq(sorted(compare(results, fewer)), ['fol', 'prop'], "More rule applications reported")
+    assert all(r['parse_median'] > 0 and len(r['parse_samples']) == 3 for r in results.values()), "parse() timed"
+    slow_parse = {f: dict(r, parse_samples=[s * 10 for s in r['parse_samples']] * 3) for f, r in results.items()}
+    beq(sorted(compare(slow_parse, {f: dict(r, parse_samples=r['parse_samples'] * 3) for f, r in results.items()})),
+        ['fol', 'prop'], "parse() slowdowns reported")
+    old_baseline = {f: {k: v for k, v in r.items() if not k.startswith('parse')} for f, r in results.items()}
+    beq(compare(slow_parse, old_baseline), {}, "Baselines without parse() timings still compare")
+    print_pass("Regressions grouped by family")
+
+    print_pass("Regression tracker: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# ENGINE TESTS
+#------------------------------------------------------------------------------------------------------------------------------:
+
+def test_engines():
+    print_test_header("Solver Engines")
+    import logging
+
+    print_section("Registry:")
+    assert {'reference', 'compact', 'parallel'} <= set(ENGINES), "Built-in engines registered"
+    verdict, stats = solve([['(p&~p)']])
+    beq(verdict, 0, "Reference engine verdict")
+    assert stats['rules']['alpha'] == 1, "Reference engine stats"
+    for engine in ['compact', 'parallel']:
+        beq(solve([['ExAy(Q(x,x)->P(y,y))']], engine)[0], 1, engine)
+    beq(solve([['(AxEyP(x,y)&EzQ(z,z))']], max_constants=1)[0], 2, "Budgets passed through")
+    try:
+        solve([['p']], 'missing')
+        assert False, "Unknown engine accepted"
+    except ValueError:
+        pass
+    print_pass("Engines looked up by name")
+
+    print_section("Differential mode:")
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logging.getLogger('tableau').addHandler(handler)
+    try:
+        @register_engine('always-sat')
+        def always_sat(tableau, max_constants=None):
+            return 1, {}
+        beq(differential_sat([['(p&~p)']], 'compact'), 0, "Agreeing engine")
+        beq(records, [], "No disagreement logged")
+        beq(differential_sat([['(p&~p)']], 'always-sat'), 1, "Fast engine answer returned")
+        beq(len(records), 1, "Disagreement logged")
+        beq(differential_sat([['(p&~p)']], 'always-sat', sample=0.0), 1, "Unsampled call")
+        beq(len(records), 1, "Unsampled calls are not cross-checked")
+    finally:
+        logging.getLogger('tableau').removeHandler(handler)
+        del ENGINES['always-sat']
+    print_pass("Disagreements with the reference are logged")
+
+    print_pass("Engines: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# SYMBOL TABLE TESTS
+
+def test_symbol_table():
+    print_test_header("SymbolTable")
+
+    print_section("Default vocabulary:")
+    table = SymbolTable()
+    pred, args = table.atom('P(x,a)')
+    beq((table.names[pred], [table.names[t] for t in args]), ('P', ['x', 'a']), "Atom split into ids")
+    assert table.atom('P(x,a)') is table.atom('P(x,a)'), "Atoms are memoised"
+    beq(table.atom('P(x)'), None, "Arity is checked")
+    beq(table.quantifier('AxP(x,x)'), ('x', 'P(x,x)'), "Quantified formula")
+    beq(table.quantifier('Axp'), ('x', 'p'), "Body starting with a proposition")
+    beq(table.quantifier('Aa(p)'), (None, None), "Constants are not bound")
+    print_pass("Default vocabulary is the coursework one")
+
+    print_section("Declared symbols:")
+    table.declare('Likes', 'predicate', 3)
+    table.declare('bob', 'constant')
+    table.declare('x1', 'variable')
+    assert table.atom('Likes(x1,bob,a)'), "Ternary atom with long names"
+    beq(table.quantifier('Ax1Likes(x1,bob,x1)'), ('x1', 'Likes(x1,bob,x1)'), "Long variable")
+    beq(table.constants_of('Ax1Likes(x1,bob,a)'), {'bob', 'a'}, "Constants of a formula")
+    for name, kind, arity in [('Likes', 'predicate', 2), ('bob', 'variable', None), ('B(', 'predicate', 1)]:
+        try:
+            table.declare(name, kind, arity)
+            assert False, f"{name} as a {kind} should be rejected"
+        except ValueError:
+            pass
+    print_pass("Names of any length and predicates of any arity")
+
+    print_section("Fresh constants:")
+    used = set(table.fresh)
+    fresh = table.fresh_constant(used)
+    beq(fresh, 'c1', "New constant once the letters run out")
+    beq(table.fresh_constant(used | {'c1'}), 'c2', "And the next one")
+    assert table.atom(f'P({fresh},a)'), "Fresh constants are declared"
+    print_pass("Fresh constants never run out")
+
+    print_section("Tableau with a declared vocabulary:")
+    import tableau
+    symbols = tableau.SYMBOLS
+    tableau.SYMBOLS = SymbolTable()
+    try:
+        tableau.SYMBOLS.declare('Likes', 'predicate', 3)
+        tableau.SYMBOLS.declare('bob', 'constant')
+        beq(parse('AxLikes(x,bob,x)'), 3, "Parses with declared symbols")
+        beq(sat([theory('(AxLikes(x,bob,x)&~Likes(bob,bob,bob))')]), 0, "Instantiated with a long constant")
+    finally:
+        tableau.SYMBOLS = symbols
+    beq(parse('AxLikes(x,bob,x)'), 0, "The global table is left alone")
+    many = 'ExP(x,x)'
+    for _ in range(29):
+        many = f'(ExP(x,x)&{many})'
+    beq(sat([theory(many)], max_constants=40), 1, "More than 26 constants")
+    beq(sat([theory('(AxEyP(x,y)&Ax~P(x,x))')], max_constants=4), 2, "Witnesses differ from the constants of their formula")
+    print_pass("Symbol table: ALL TESTS PASSED")
+
+    print_section("Witnesses stay within their search:")
+    nested = 'Ex(P(x,x)&((Q(x,x)\\/R(x,x))&((p\\/q)&(r\\/s))))'
+    for _ in range(23):
+        nested = f'Ex(S(x,x)&{nested})'
+    beq(sat([theory(nested)], max_constants=40), 1, "Needs more constants than there are letters")
+    beq(parse('P(c1,a)'), 0, "Made up witnesses are not parsed afterwards")
+    with SYMBOLS.scope():
+        beq(SYMBOLS.fresh_constant(set(SYMBOLS.fresh)), 'c1', "Nor kept as fresh names")
+    unsat = f'({nested}&(Ax~Q(x,x)&Ax~R(x,x)))'
+    beq(sat_parallel([[unsat]], workers=3, max_constants=40), 0, "Workers read witnesses made by another worker")
+    theory40 = Theory([nested], max_constants=40)
+    beq(theory40.query('Ax~S(x,x)'), 0, "Theories keep the witnesses of their branches")
+    b = TableauBranch(['S(a,a)', 'R(c1,c1)', 'Ax~R(x,x)'])
+    beq(sat([decode_branch(encode_branch(b))]), 1, "R(c1,c1) is not an atom outside a search")
+    print_pass("Fresh constants are scoped to a search")
+
+    print_section("Memos stay bounded:")
+    limit = tableau.MEMO_LIMIT
+    tableau.MEMO_LIMIT = 8
+    try:
+        for i in range(20):
+            sat([theory(f'(Ax{"~" * i}P(x,x)&P(a,b))')])
+        assert len(WORK_KINDS) <= 8 and len(SYMBOLS.formula_constants) <= 8, "Memos emptied at the limit"
+    finally:
+        tableau.MEMO_LIMIT = limit
+    work_kind('P(a,a)')
+    with SYMBOLS.scope():
+        SYMBOLS.fresh_constant(set(SYMBOLS.fresh))
+    beq(WORK_KINDS, {}, "Memos emptied when the vocabulary changes")
+    print_pass("Memos do not grow without bound")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# PURE LITERAL TESTS
+
+def test_pure_literals():
+    print_test_header("Pure literal pruning")
+    ctx = SearchContext()
+
+    print_section("Polarity:")
+    p = SYMBOLS.ids['P']
+    beq(ctx.polarity('(p->q)'), {('p', -1), ('q', 1)}, "Implication flips its left side")
+    beq(ctx.polarity('~Ax~P(x,x)'), {(p, 1)}, "Negations cancel through quantifiers")
+    beq(ctx.polarity('(P(a,a)\\/~P(b,b))'), {(p, 1), (p, -1)}, "Both signs")
+    print_pass("Signs of atom occurrences")
+
+    print_section("Pruning a branch:")
+    b = TableauBranch(['(q\\/r)', '(s->q)', '(p->r)', 'p', 'AxEyS(x,y)', '~r'])
+    beq(prune_pure(b, ctx), 2, "Formulas over pure predicates removed")
+    beq(b.formulas, ['(q\\/r)', '(p->r)', 'p', '~r'], "Formulas with a mixed predicate are kept")
+    print_pass("Pure formulas are removed")
+
+    print_section("Verdicts are kept:")
+    fmlas = ['((P(a,b)\\/Q(a,b))&((P(b,c)\\/Q(b,c))&(Ax~P(x,x)&AxAy~Q(x,y))))', '(q&~(p\\/~p))',
+             '(Ax(P(x,x)&~P(x,x))&ExQ(x,x))', '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))', '~~~~~~~~~~~q',
+             '((p\\/q)&((p->~p)&(~p->p)))', 'ExAy(Q(x,x)->P(y,y))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], pure_literals=True), sat([theory(fmla)]), fmla)
+    plain, pruned = {}, {}
+    sat([theory(fmlas[0])], stats=plain)
+    sat([theory(fmlas[0])], stats=pruned, pure_literals=True)
+    assert pruned['rules']['gamma'] < plain['rules']['gamma'], "Fewer gamma instances"
+    plain, pruned = {}, {}
+    sat([theory('((((p\\/q)&(r\\/s))&(p\\/~r))&~q)')], stats=plain)
+    sat([theory('((((p\\/q)&(r\\/s))&(p\\/~r))&~q)')], stats=pruned, pure_literals=True)
+    assert pruned['rules']['beta'] < plain['rules']['beta'], "Fewer beta splits"
+    beq(sat([theory('(AxEyP(x,y)&EzQ(z,z))')], pure_literals=True), 1, "Decided without running out of constants")
+    b = TableauBranch(['(p->q)', 'AxQ(x,x)', '(P(a,a)&~R(a,a))'])
+    sat([b], pure_literals=True)
+    sat([b], pure_literals=True, compact=True)
+    beq(b.formulas, ['(p->q)', 'AxQ(x,x)', '(P(a,a)&~R(a,a))'], "The caller's branch is not pruned")
+    print_pass("Pure literals: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# SIMPLIFICATION TESTS
+
+def test_simplify():
+    print_test_header("simplify_formula()")
+
+    print_section("Folding:")
+    beq(simplify_formula('(p->p)'), TOP, "A->A")
+    beq(simplify_formula('(q&~(p\\/~p))'), BOTTOM, "A\\/~A inside a conjunction")
+    beq(simplify_formula('(~~~p\\/(q&~q))'), '~p', "Double negations and A&~A")
+    beq(simplify_formula('~~~~~~~~~~~q'), '~q', "Negation chain")
+    beq(simplify_formula('((p&q)&(q&p))'), '(p&q)', "Repeated conjuncts")
+    beq(simplify_formula('Ax(P(x,x)\\/~P(x,x))'), TOP, "Quantified tautology")
+    beq(simplify_formula('(ExP(x,x)&Ax(~P(x,x)->P(x,x)))'), '(ExP(x,x)&AxP(x,x))', "~A->A is A")
+    beq(simplify_formula('((p->q)&~(p->q))'), BOTTOM, "Complementary compound formulas")
+    beq(simplify_formula('(p->(q->r))'), '(p->(q->r))', "Nothing to simplify")
+    print_pass("Trivial subformulas are folded")
+
+    print_section("sat() with simplify:")
+    beq(simplify_tableau([['(p->p)', 'q'], ['~(p->p)', 'q']]), [['q']], "Branches simplified")
+    for fmla in ['~(p->(q->p))', '(~~~p\\/(q&~q))', '(q&~(p\\/~p))', '((p\\/q)&((p->~p)&(~p->p)))',
+                 '~Ax(P(x,x)&~P(x,x))', '(Ax(P(x,x)&~P(x,x))&ExQ(x,x))', '(p->p)']:
+        beq(sat([theory(fmla)], simplify=True), sat([theory(fmla)]), fmla)
+    stats = {}
+    beq(sat([theory('((p\\/q)&((p->~p)&(~p->p)))')], simplify=True, stats=stats), 0, "Answered without search")
+    beq(sum(stats['rules'].values()), 0, "No rules applied")
+    print_pass("Simplification: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# TABLING TESTS
+
+def test_tabling():
+    print_test_header("ClosureTable")
+
+    print_section("Closure propagation:")
+    table = ClosureTable()
+    root, left, right = frozenset(['(p\\/q)', 'r']), frozenset(['p', 'r']), frozenset(['q', 'r'])
+    table.expanded(root, [left, right])
+    table.close(left)
+    assert not table.subsumed(root), "One closed child does not close the parent"
+    table.close(right)
+    assert table.subsumed(root), "Both children closed"
+    assert table.subsumed(root | {'s'}), "Supersets of a closed state are closed"
+    assert not table.subsumed(frozenset(['(p\\/q)'])), "Subsets are not"
+    print_pass("Closed states propagate to their parents")
+
+    print_section("sat() with tabling:")
+    fmlas = ['((p\\/q)&((p->~p)&(~p->p)))', '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))', '~Ax~Ey~P(x,y)',
+             '(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))', '(AxAy(P(x,y)->P(y,x))&(P(a,b)&~P(b,a)))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], tabling=True), sat([theory(fmla)]), fmla)
+    stats = {}
+    sat([theory(fmlas[0])], tabling=True, stats=stats)
+    beq(stats['rules']['tabled'], 1, "Twin branch dropped")
+
+    table = ClosureTable()
+    beq(sat([theory(fmlas[3])], tabling=table), 0, "Unsatisfiable")
+    stats = {}
+    beq(sat([['r', fmlas[3]]], tabling=table, stats=stats), 0, "Larger input containing it")
+    beq(dict(stats['rules']), {'tabled': 1}, "Cut by the shared table")
+    beq(sat([theory('p')], tabling=table), 1, "Satisfiable")
+    stats = {}
+    beq(sat([theory('p')], tabling=table, stats=stats), 1, "Same input again")
+    beq(stats['rounds'], 1, "Answered from the known open state")
+    print_pass("Tabling: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# BACKJUMPING TESTS
+
+def test_backjumping():
+    print_test_header("DependencyTracker")
+
+    print_section("Dependency labels:")
+    tracker = DependencyTracker()
+    ctx = SearchContext(dependencies=tracker)
+    b = TableauBranch(['((p\\/q)&r)'])
+    b = expand_tableau(b, ctx)[0]
+    beq(b.deps, {'(p\\/q)': frozenset(), 'r': frozenset()}, "Alpha results depend on no decision")
+    left, right = expand_tableau(b, ctx)
+    beq((left.deps['p'], right.deps['q']), ({(0, 0)}, {(0, 1)}), "Beta results depend on their alternative")
+    beq(right.decisions, ((0, 1),), "Decisions of a branch")
+    b = expand_tableau(TableauBranch(['ExP(x,x)']), ctx)[0]
+    beq(b.deps['P(a,a)'], {DELTA}, "Delta results are marked")
+    print_pass("Formulas carry their decisions")
+
+    print_section("Learning from closed branches:")
+    tracker = DependencyTracker()
+    ctx = SearchContext(dependencies=tracker)
+    root = TableauBranch(['(p\\/q)', '(r\\/s)', '~r', '~s'])
+    left, right = expand_tableau(root, ctx)
+    deeper = expand_tableau(left, ctx)
+    assert not tracker.closed(deeper[0]), "Conflict on r alone"
+    assert tracker.pruned(deeper[0]), "Branch below the conflict is dead"
+    assert not tracker.pruned(right), "Sibling of the p/q split is not"
+    assert tracker.closed(deeper[1]), "Both alternatives of r/s closed without the p/q split"
+    beq(encode_branch(decode_branch(encode_branch(deeper[1]))), encode_branch(deeper[1]), "Labels survive encoding")
+    print_pass("Conflicts jump over splits that did not take part")
+
+    print_section("sat() with backjumping:")
+    fmlas = ['((p\\/((q\\/r)&((s\\/~s)&(p\\/q))))&(AxP(x,x)&Ex~P(x,x)))',
+             '((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))',
+             '((p\\/q)&(~p\\/~q))', '(((p\\/q)&(p\\/~q))&((~p\\/q)&(~p\\/~q)))', '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], backjumping=True), sat([theory(fmla)]), fmla)
+        beq(sat([theory(fmla)], backjumping=True, compact=True, frontier_limit=1), sat([theory(fmla)]), fmla)
+    for fmla in fmlas[:2]:
+        plain, jumped = {}, {}
+        sat([theory(fmla)], stats=plain)
+        sat([theory(fmla)], stats=jumped, backjumping=True)
+        assert jumped['rules']['beta'] < plain['rules']['beta'], "Fewer beta splits"
+    beq(sat([['p', '~p'], ['q']], backjumping=True), 1, "A closed initial branch leaves the others open")
+    beq(sat([['p', '~p'], ['(q&~q)']], backjumping=True), 0, "Closed once every initial branch is")
+    beq(sat([['(p\\/q)', '~p'], ['(p\\/q)', '~q'], ['(p&~p)']], backjumping=True, compact=True), 1,
+        "Initial branches sharing formulas")
+    print_pass("Backjumping: ALL TESTS PASSED")
+
+#------------------------------------------------------------------------------------------------------------------------------:
+# GAMMA RELEVANCE TESTS
+
+def test_gamma_relevance():
+    print_test_header("Relevance-guided gamma")
+    ctx = SearchContext(relevance=True)
+
+    print_section("Relevant instances:")
+    b = TableauBranch(['AxP(x,x)', '~P(b,b)', 'Q(a,a)', 'Q(c,c)'])
+    assert ctx.relevant(b, 'P(b,b)'), "Complement of ~P(b,b)"
+    assert not ctx.relevant(b, 'P(a,a)'), "Nothing to close with"
+    beq(relevant_constants(b, 'AxP(x,x)', {'a', 'b', 'c'}, ctx), ['b'], "Only the relevant constant")
+    b.add_gamma_instance('AxP(x,x)', 'b')
+    beq(relevant_constants(b, 'AxP(x,x)', {'a', 'b', 'c'}, ctx), ['a'], "Then one irrelevant constant at a time")
+    beq(expand_tableau(TableauBranch(['AxP(x,x)', '~P(b,b)', 'Q(a,a)', 'Q(c,c)']), ctx)[0].formulas[-1], 'P(b,b)',
+        "Gamma step adds the relevant instance")
+    beq(select_target_formula(TableauBranch(['AxP(x,x)', 'ExQ(x,x)', 'Q(a,a)']), ctx), 'ExQ(x,x)',
+        "Irrelevant instances come after delta")
+    print_pass("Instances that can close the branch come first")
+
+    print_section("sat() with relevance:")
+    fmlas = ['(AxAy(P(x,y)->P(y,x))&(P(a,b)&~P(b,a)))', '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))',
+             '((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))',
+             '((P(a,b)\\/Q(a,b))&((P(b,c)\\/Q(b,c))&(Ax~P(x,x)&AxAy~Q(x,y))))', '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], relevance=True), sat([theory(fmla)]), fmla)
+    plain, ordered = {}, {}
+    sat([theory(fmlas[2])], stats=plain)
+    sat([theory(fmlas[2])], stats=ordered, relevance=True)
+    assert ordered['rules']['gamma'] <= plain['rules']['gamma'], "No more gamma steps"
+    assert ordered['peak_branch_bytes'] < plain['peak_branch_bytes'], "Smaller branches"
+    print_pass("Gamma relevance: ALL TESTS PASSED")
+
+def test_semi_naive_gamma():
+    print_test_header("Semi-naive gamma instantiation")
+    ctx = SearchContext()
+
+    print_section("Constants on the branch:")
+    b = TableauBranch(['AxP(x,x)', 'Q(a,a)', 'R(b,b)', 'Q(c,c)'])
+    beq(b.seen, ['a', 'b', 'c'], "In order of appearance")
+    b.remove_formula('R(b,b)')
+    beq(b.seen, ['a', 'c'], "Forgotten once no formula mentions them")
+    beq(b.copy().seen, ['a', 'c'], "Copied with the branch")
+    print_pass("Constants are tracked as formulas come and go")
+
+    print_section("Watermarks:")
+    beq(pending_constants(b, 'AxP(x,x)', ctx), ['a', 'c'], "Every constant is new at first")
+    [b] = expand_tableau(b, ctx)
+    beq(b.watermarks['AxP(x,x)'], 2, "Gamma step moves the watermark")
+    beq(pending_constants(b, 'AxP(x,x)', ctx), [], "Nothing new since")
+    b.add_formula('R(b,b)')
+    beq(pending_constants(b, 'AxP(x,x)', ctx), ['b'], "Only the new constant")
+    b.remove_formula('Q(a,a)')
+    b.remove_formula('P(a,a)')
+    beq((b.seen, b.watermarks['AxP(x,x)']), (['c', 'b'], 1), "Watermark follows forgotten constants")
+    beq(pending_constants(TableauBranch(['AxP(x,x)']), 'AxP(x,x)', ctx), ['a'], "Domain is never empty")
+    print_pass("Only constants newer than the last instantiation are looked at")
+
+    print_section("Compact branches:")
+    table = FormulaTable()
+    c = BitsetBranch(table, ['AxP(x,x)', 'Q(a,b)'])
+    c.add_formula('Q(a,b)')
+    c.remove_formula('Q(a,b)')
+    beq(c.seen, [], "Duplicate adds are counted once")
+    print_pass("Compact branches track constants too")
+
+    print_section("sat() results unchanged:")
+    fmlas = ['(AxEy(Q(x,x)->(P(y,y)&R(x,y)))&~Ax(Q(x,x)->Ey(P(y,y)&R(x,y))))', '(AxEyP(x,y)&EzQ(z,z))',
+             '(AxAy(P(x,y)->P(y,x))&(P(a,b)&~P(b,a)))', '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))']
+    for fmla, expected in zip(fmlas, [2, 2, 0, 0]):
+        beq(sat([theory(fmla)]), expected, fmla)
+        beq(sat([theory(fmla)], compact=True), expected, fmla + " (compact)")
+    print_pass("Semi-naive gamma: ALL TESTS PASSED")
+
+def test_pending_work():
+    print_test_header("Pending work counts")
+    ctx = SearchContext()
+
+    print_section("Counts:")
+    b = TableauBranch(['AxP(x,x)', '(Q(a,a)&Q(b,b))', '~~R(a,a)', 'Q(c,c)'])
+    beq((b.unexpanded, b.gammas, b.outstanding), (2, 1, 3), "Two rule formulas and an instance per constant")
+    beq(TableauBranch(['P(c,a)', 'Q(b,b)']).seen, ['a', 'c', 'b'], "Constants of a formula are seen in sorted order")
+    assert not b.saturated(), "Work left"
+    b = expand_tableau(b, ctx)[0]
+    beq((b.unexpanded, b.outstanding), (1, 3), "Double negation step leaves a literal")
+    while not b.saturated():
+        [b] = expand_tableau(b, ctx)
+    beq(sorted(f for f in b.formulas if f.startswith('P')), ['P(a,a)', 'P(b,b)', 'P(c,c)'], "Saturated after every instance")
+    b.add_formula('R(d,d)')
+    beq(b.outstanding, 1, "A new constant is a new gamma instance")
+    b.remove_formula('R(d,d)')
+    beq(b.outstanding, 0, "And is gone with it")
+    assert TableauBranch(['Q(a,a)', '~R(b,b)']).saturated(), "Literals only"
+    assert not TableauBranch(['AxP(x,x)']).saturated(), "The domain is never empty"
+    print_pass("Pending work is counted as rules fire")
+
+    print_section("Compact branches:")
+    c = BitsetBranch(FormulaTable(), ['AxP(x,x)', '(Q(a,a)&Q(b,b))'])
+    beq((c.unexpanded, c.gammas, c.outstanding), (1, 1, 2), "Counted on compact branches too")
+    c = expand_tableau(c, ctx)[0]
+    beq(c.copy().outstanding, 2, "Copied with the branch")
+    print_pass("Compact branches count pending work")
+
+    print_section("sat() results unchanged:")
+    for fmla, expected in [('(AxP(x,x)&~P(a,a))', 0), ('(AxP(x,x)&Q(a,a))', 1), ('(p&(q\\/~p))', 1),
+                           ('(AxEyP(x,y)&EzQ(z,z))', 2), ('Ax(p\\/P(x,x))', 1)]:
+        beq(sat([theory(fmla)]), expected, fmla)
+        beq(explore_step(TableauBranch([fmla]), MAX_CONSTANTS, ctx)[0], 'expanded', fmla + " is expanded first")
+    beq(explore_step(TableauBranch(['p', 'q']), MAX_CONSTANTS, ctx), ('open', []), "Saturated branch is open")
+    print_pass("Pending work: ALL TESTS PASSED")
+
+def test_checkpoint():
+    print_test_header("Checkpoint and resume")
+    import os
+    import tempfile
+
+    class Interrupt(Exception):
+        pass
+
+    class StopAfter(Tracer):
+        '''Tracer that stops the search after a number of rule applications, like a worker restart'''
+        def __init__(self, n):
+            super().__init__(ring=1)
+            self.n = n
+
+        def rule(self, branch, rule, target, expanded):
+            self.n -= 1
+            if self.n < 0:
+                raise Interrupt()
+
+    fmlas = ['((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))',
+             '(AxEyP(x,y)&EzQ(z,z))', '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))', '((p\\/q)&(~p\\/r))']
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search.ckpt')
+
+        print_section("Writing checkpoints:")
+        stats = {}
+        beq(sat([theory(fmlas[0])], stats=stats, checkpoint=path, checkpoint_interval=0), 0, "Verdict unchanged")
+        beq(stats['checkpoints'], stats['rounds'], "One checkpoint per round with interval 0")
+        with open(path, 'rb') as f:
+            beq(f.read(4), b'TBCK', "Versioned file")
+        stats = {}
+        sat([theory(fmlas[0])], stats=stats, checkpoint=path)
+        beq(stats['checkpoints'], 0, "None before the interval has passed")
+        print_pass("Checkpoints are written every interval")
+
+        print_section("Resuming:")
+        for fmla in fmlas:
+            for options in [{}, {'compact': True}, {'frontier_limit': 1, 'spill_dir': tmp}]:
+                plain = {}
+                expected = sat([theory(fmla)], stats=plain, **options)
+                if os.path.exists(path):
+                    os.remove(path)
+                try:
+                    sat([theory(fmla)], trace=StopAfter(3), checkpoint=path, checkpoint_interval=0, **options)
+                except Interrupt:
+                    pass
+                resumed = {}
+                beq(sat([theory(fmla)], stats=resumed, checkpoint=path, resume=True, **options), expected,
+                    fmla + " resumes to the same verdict")
+                beq(resumed['rules'], plain['rules'], fmla + " continues the rule counts")
+        os.remove(path)
+        beq(sat([theory(fmlas[3])], checkpoint=path, resume=True), 1, "Missing checkpoint starts afresh")
+        print_pass("Interrupted searches resume where they left off")
+
+        print_section("Errors:")
+        sat([theory(fmlas[2])], checkpoint=path, checkpoint_interval=0)
+        try:
+            sat([theory(fmlas[3])], checkpoint=path, resume=True)
+            assert False, "Different tableau"
+        except ValueError:
+            pass
+        with open(path, 'r+b') as f:
+            f.write(b'XXXX')
+        try:
+            sat([theory(fmlas[2])], checkpoint=path, resume=True)
+            assert False, "Not a checkpoint"
+        except ValueError:
+            pass
+        try:
+            sat([theory(fmlas[2])], checkpoint=path, backjumping=True)
+            assert False, "Backjumping state is not saved"
+        except ValueError:
+            pass
+        print_pass("Checkpoint and resume: ALL TESTS PASSED")
+
+def test_progress():
+    print_test_header("Progress snapshots")
+    import os
+    import signal
+    import tempfile
+    fmla = '((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))'
+
+    print_section("Callback:")
+    snapshots, stats = [], {}
+    beq(sat([theory(fmla)], stats=stats, progress=Progress(snapshots.append, interval=0)), 0, "Verdict unchanged")
+    last = snapshots[-1]
+    beq(last['rounds'], stats['rounds'], "Rounds done")
+    beq(last['rules'], sum(stats['rules'].values()), "Rule applications")
+    beq((last['constant_bound'], last['constant_limit']), (2, MAX_CONSTANTS), "Constant bound and limit")
+    assert all(a['closed_branches'] <= b['closed_branches'] for a, b in zip(snapshots, snapshots[1:])), "Closed only grows"
+    assert max(s['live_branches'] for s in snapshots) <= stats['peak_branches'] * 2, "Live branches"
+    assert any(s['growth'] > 0 for s in snapshots), "Frontier growth"
+    snapshots = []
+    sat([theory(fmla)], progress=Progress(snapshots.append))
+    beq(snapshots, [], "Nothing before the interval has passed")
+    print_pass("Snapshots go to the callback")
+
+    print_section("Prometheus text file:")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tableau.prom')
+        sat([theory(fmla)], progress=Progress(path=path, interval=0))
+        with open(path) as f:
+            text = f.read()
+        assert '# TYPE tableau_rounds counter\n' in text, "Counter type"
+        assert '# TYPE tableau_live_branches gauge\n' in text, "Gauge type"
+        beq(os.listdir(tmp), ['tableau.prom'], "Written through a partial file")
+    beq(prometheus_text({'rounds': 3, 'growth': 0.5}, prefix='x_'),
+        '# TYPE x_rounds counter\nx_rounds 3\n# TYPE x_growth gauge\nx_growth 0.5\n', "Exposition format")
+    print_pass("Snapshots go to a metrics file")
+
+    print_section("Signal:")
+    if hasattr(signal, 'SIGUSR1'):
+        snapshots = []
+        p = Progress(snapshots.append, interval=3600, signum=signal.SIGUSR1)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        sat([theory(fmla)], progress=p)
+        beq(len(snapshots), 1, "One snapshot per signal")
+        p.close()
+        beq(signal.getsignal(signal.SIGUSR1), signal.SIG_DFL, "Handler put back")
+    print_pass("Progress: ALL TESTS PASSED")
+
+def test_symmetry():
+    print_test_header("Symmetry reduction")
+    ctx = SearchContext()
+
+    print_section("Renaming constants:")
+    beq(rename_constants('(P(a,c)&Ax(p\\/Q(x,c)))', {'c': '#0', 'p': '#1'}), '(P(a,#0)&Ax(p\\/Q(x,#0)))',
+        "Only arguments of atoms are renamed")
+    print_pass("Constants are renamed inside atoms")
+
+    print_section("Canonical states:")
+    b1 = TableauBranch(['P(c,c)', 'Q(d,d)', 'AxR(x,x)'], {'AxR(x,x)': {'c'}}, ['c', 'd'])
+    b2 = TableauBranch(['Q(c,c)', 'P(d,d)', 'AxR(x,x)'], {'AxR(x,x)': {'d'}}, ['c', 'd'])
+    beq(canonical_state(b1, ctx), canonical_state(b2, ctx), "Equal up to swapping introduced constants")
+    b3 = TableauBranch(['Q(c,c)', 'P(d,d)', 'AxR(x,x)'], {'AxR(x,x)': {'c'}}, ['c', 'd'])
+    assert canonical_state(b1, ctx) != canonical_state(b3, ctx), "Gamma bookkeeping is part of the state"
+    b4 = TableauBranch(['Q(a,a)', 'P(d,d)'], {}, ['d'])
+    assert canonical_state(TableauBranch(['P(a,a)', 'Q(d,d)'], {}, ['d']), ctx) != canonical_state(b4, ctx), \
+        "Input constants keep their names"
+    b5 = TableauBranch(['P(c,d)', 'P(d,c)'], {}, ['c', 'd'])
+    b6 = TableauBranch(['P(d,c)', 'P(c,d)'], {}, ['d', 'c'])
+    beq(canonical_state(b5, ctx), canonical_state(b6, ctx), "Tied constants are tried in every order")
+    beq(sorted(constant_colours(['c', 'd', 'e'], ['P(a,c)', 'P(c,d)', 'P(d,e)'])), [['c'], ['d'], ['e']],
+        "Refined colours tell a chain apart")
+    beq(canonical_state(b1, SearchContext(blocking=True))[2], ('#0', '#1'), "Introduction order kept when blocking")
+    print_pass("Canonical states identify symmetric branches")
+
+    print_section("sat() with symmetry:")
+    fmlas = ['((ExP(x,x)&EyQ(y,y))\\/(EyQ(y,y)&ExP(x,x)))',
+             '(((ExP(x,x)&EyQ(y,y))\\/(EyQ(y,y)&ExP(x,x)))&Ax~P(x,x))',
+             '((((ExP(x,x)&EyQ(y,y))\\/(EyQ(y,y)&ExP(x,x)))&((ExR(x,x)&EyS(y,y))\\/(EyS(y,y)&ExR(x,x))))'
+             '&AxAy(P(x,x)->~Q(y,y)))', '(AxEyP(x,y)&EzQ(z,z))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], symmetry=True), sat([theory(fmla)]), fmla)
+        beq(sat([theory(fmla)], symmetry=True, compact=True, blocking=True), sat([theory(fmla)], blocking=True),
+            fmla + " (compact, blocking)")
+    plain, reduced = {}, {}
+    sat([theory(fmlas[2])], stats=plain)
+    sat([theory(fmlas[2])], stats=reduced, symmetry=True)
+    assert reduced['rules']['symmetric'] > 0, "Symmetric branches dropped"
+    assert reduced['peak_branches'] < plain['peak_branches'], "Smaller frontier"
+    import time
+    start = time.perf_counter()
+    beq(sat([theory(fmlas[3])], max_constants=15, symmetry=True), 2, "Chain of 14 introduced constants")
+    assert time.perf_counter() - start < 2, "Symmetry reduction stays fast along a chain"
+    print_pass("Symmetry reduction: ALL TESTS PASSED")
+
+def test_linear_rules():
+    print_test_header("In-place linear rules")
+    ctx = SearchContext()
+
+    print_section("Rule priorities:")
+    for fmla, expected in [('~~p', 0), ('~AxP(x,x)', 1), ('(p&q)', 2), ('~(p\\/q)', 2), ('(p\\/q)', 10),
+                           ('~(p&q)', 10), ('ExP(x,x)', 20), ('AxP(x,x)', 30)]:
+        beq(rule_priority(fmla), expected, fmla)
+    print_pass("Priorities match select_target_formula()")
+
+    print_section("expand_linear():")
+    b = TableauBranch(['~~(p&~(q\\/r))', '(s\\/t)', 'ExP(x,x)', 'AxQ(x,x)'])
+    beq(expand_linear(b, ctx), 4, "Double negation, two alphas and a delta")
+    beq(sorted(b.formulas), sorted(['p', '~q', '~r', '(s\\/t)', 'P(a,a)', 'AxQ(x,x)']), "Applied in place")
+    b = TableauBranch(['(p&~p)', '(q&r)'])
+    beq(expand_linear(b, ctx), 1, "Stops once the branch closes")
+    b = TableauBranch(['(P(a,a)&P(b,b))', 'ExQ(x,x)'])
+    beq(expand_linear(b, ctx, bound=1), 1, "No new constants beyond the bound")
+    table = FormulaTable()
+    table.intern('p')
+    b = BitsetBranch(table, ['~~(p&~(q\\/r))', '(s\\/t)'])
+    beq(expand_linear(b, ctx), 3, "Bitset branches pick up formulas with lower IDs")
+    beq(sorted(b.formulas), sorted(['p', '~q', '~r', '(s\\/t)']), "Applied in place to bitsets")
+    b = TableauBranch(['~~(p&q)', '(r\\/s)'])
+    sat([b], linear=True)
+    beq(b.formulas, ['~~(p&q)', '(r\\/s)'], "The caller's branch is left alone")
+    print_pass("Non-branching rules are saturated in one pass")
+
+    print_section("Hooks:")
+    tracker = DependencyTracker()
+    b = TableauBranch(['(p&q)'], deps={'(p&q)': frozenset({(0, 1)})})
+    expand_linear(b, SearchContext(dependencies=tracker))
+    beq(b.deps, {'p': frozenset({(0, 1)}), 'q': frozenset({(0, 1)})}, "Dependencies carried over")
+    tracer = Tracer(ring=10)
+    expand_linear(TableauBranch(['~~(p&q)']), SearchContext(tracer=tracer))
+    beq([(e['b'], e['c']) for e in tracer.ring], [(0, [1]), (1, [2])], "Each step traced as a child")
+    print_pass("Tracer and dependency tracker see every step")
+
+    print_section("sat() with linear:")
+    fmlas = ['~' * 40 + '(((p&q)&(r&s))&(((p&q)&(r&s))&~(~p\\/~(q&r))))', '(AxEyP(x,y)&EzQ(z,z))',
+             '(Ax(P(x,x)->Q(x,x))&(P(a,a)&~Q(a,a)))', '((p\\/q)&~(p\\/q))', '~(ExP(x,x)->(p&~p))']
+    for fmla in fmlas:
+        beq(sat([theory(fmla)], linear=True), sat([theory(fmla)]), fmla)
+        beq(sat([theory(fmla)], linear=True, compact=True, backjumping=True), sat([theory(fmla)]), fmla + " (options)")
+    plain, linear = {}, {}
+    sat([theory(fmlas[0])], stats=plain)
+    sat([theory(fmlas[0])], stats=linear, linear=True)
+    assert linear['rounds'] < plain['rounds'], "Fewer rounds"
+    beq(linear['rules'], plain['rules'], "Same rule applications")
+    print_pass("In-place linear rules: ALL TESTS PASSED")
+
+def test_strategies():
+    print_test_header("Expansion strategies")
+
+    print_section("Presets:")
+    beq(sorted(STRATEGIES), ['default', 'delay_delta', 'fewest_children', 'gamma_first'], "Registered presets")
+    beq(get_strategy('gamma_first'), STRATEGIES['gamma_first'], "By name")
+    beq(get_strategy(None), None, "Built-in order")
+    try:
+        get_strategy('fastest')
+        assert False, "Unknown strategy"
+    except ValueError:
+        pass
+    b = TableauBranch(['(p\\/q)', '(r\\/~s)', 's', 'ExP(x,x)', 'AxQ(x,x)'])
+    picks = {name: select_target_formula(b, SearchContext(strategy=s)) for name, s in STRATEGIES.items()}
+    beq(picks, {'default': '(p\\/q)', 'delay_delta': '(p\\/q)', 'fewest_children': '(r\\/~s)', 'gamma_first': 'AxQ(x,x)'},
+        "Each preset picks its own target")
+    beq(select_target_formula(TableauBranch(['ExP(x,x)', 'AxQ(x,x)', 'Q(a,a)', 'R(b,b)']),
+                              SearchContext(strategy=STRATEGIES['delay_delta'])), 'AxQ(x,x)', "Delta after gamma")
+    print_pass("Presets change the order of expansion")
+
+    print_section("Custom strategies:")
+    @register_strategy('alpha_last')
+    class AlphaLast(Strategy):
+        ranks = {**Strategy.ranks, 2: 50}
+    try:
+        beq(select_target_formula(TableauBranch(['(p&q)', '(r\\/s)']), SearchContext(strategy=AlphaLast())),
+            '(r\\/s)', "Subclass ranks")
+        beq(sat([theory('((p&q)&(~p\\/~q))')], strategy='alpha_last'), 0, "Usable by name once registered")
+    finally:
+        del STRATEGIES['alpha_last']
+    print_pass("Strategies can be added")
+
+    print_section("sat() with strategies:")
+    fmlas = ['((((p\\/q)\\/(r\\/s))&(q\\/((r->s)&(s->~r))))&(AxAy(P(x,y)->Q(x,y))&(P(a,b)&~Q(a,b))))',
+             '(AxEyP(x,y)&EzQ(z,z))', '((p\\/q)&((p->~p)&(~p->p)))', '(ExP(x,x)&Ax(~P(x,x)->P(x,x)))']
+    for fmla in fmlas:
+        plain, default = {}, {}
+        expected = sat([theory(fmla)], stats=plain)
+        beq(sat([theory(fmla)], stats=default, strategy='default'), expected, fmla)
+        beq(default['rules'], plain['rules'], fmla + " expands the same with the default strategy")
+        for name in STRATEGIES:
+            beq(sat([theory(fmla)], strategy=name), expected, fmla + " with " + name)
+    fmla = '(AxEy(Q(x,x)->(P(y,y)&R(x,y)))&~Ax(Q(x,x)->Ey(P(y,y)&R(x,y))))'
+    beq((sat([theory(fmla)]), sat([theory(fmla)], strategy='delay_delta')), (2, 0), "Delaying delta decides more")
+    print_pass("Strategies rank formulas")
+
+    print_section("Search options:")
+    options = SearchOptions(strategy='delay_delta', linear=True)
+    beq(sat([theory(fmla)], options=options), sat([theory(fmla)], strategy='delay_delta', linear=True),
+        "Options given whole or as keywords")
+    for bad in [{'strategy': 'nope'}, {'checkpoint': 'x.ckpt', 'backjumping': True}]:
+        try:
+            SearchOptions(**bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+    try:
+        sat([theory(fmla)], linera=True)
+        assert False, "Unknown options should be rejected"
+    except TypeError:
+        pass
+    try:
+        sat([theory(fmla)], options=SearchOptions(linear=True), symmetry=True)
+        assert False, "Keyword options next to options should be rejected"
+    except TypeError:
+        pass
+    print_pass("Strategies: ALL TESTS PASSED")
+
 #------------------------------------------------------------------------------------------------------------------------------:
 # RUN ALL TESTS
 #------------------------------------------------------------------------------------------------------------------------------:
@@ -969,6 +2115,45 @@ def run_all_tests():
         ("SAT - FOL Basic", test_sat_fol_basic),
         ("SAT - FOL Advanced", test_sat_fol_advanced),
         ("SAT - Edge Cases", test_sat_edge_cases),
+        ("SAT - Constant Budget", test_sat_constant_budget),
+        ("SAT - Blocking", test_sat_blocking),
+        ("Bitset Branches", test_bitset_branch),
+        ("Frontier", test_frontier),
+        ("Gamma Instance Cache", test_gamma_instance_cache),
+        
+        # Entailment tests
+        ("Theory - Entailment", test_theory_entailment),
+        
+        # Parallel tests
+        ("SAT - Parallel", test_sat_parallel),
+        
+        # Server tests
+        ("Solver Server", test_solver_server),
+        
+        # Bulk parsing tests
+        ("Bulk Parsing", test_parse_lines),
+        
+        # Tracing tests
+        ("Tracer", test_tracer),
+        
+        # Benchmark tests
+        ("Regression Tracker", test_regression_tracker),
+        
+        # Engine tests
+        ("Solver Engines", test_engines),
+        ("Symbol Table", test_symbol_table),
+        ("Pure Literals", test_pure_literals),
+        ("Simplification", test_simplify),
+        ("Tabling", test_tabling),
+        ("Backjumping", test_backjumping),
+        ("Gamma Relevance", test_gamma_relevance),
+        ("Semi-naive gamma", test_semi_naive_gamma),
+        ("Pending work", test_pending_work),
+        ("Checkpoint and resume", test_checkpoint),
+        ("Progress snapshots", test_progress),
+        ("Symmetry reduction", test_symmetry),
+        ("In-place linear rules", test_linear_rules),
+        ("Expansion strategies", test_strategies),
     ]
     
     for test_name, test_func in tests:
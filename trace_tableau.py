@@ -0,0 +1,73 @@
+# Summarise a trace written by tableau.Tracer
+# Run with: python trace_tableau.py trace.jsonl [--top N]
+
+import argparse
+import json
+from collections import Counter
+
+def load_trace(path):
+    '''Read the events of a trace and the formula of each id'''
+    events, formulas = [], []
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event['e'] == 'formulas':
+                formulas = event['f']
+            else:
+                events.append(event)
+    return events, formulas
+
+def subtree_sizes(events):
+    '''Number of traced branches below and including each branch'''
+    children = {}
+    for event in events:
+        if event['e'] == 'rule':
+            children[event['b']] = [c for c in event['c'] if c != event['b']]
+    sizes = {}
+    for root in children:
+        stack = [(root, False)]
+        while stack:
+            b, visited = stack.pop()
+            if b in sizes:
+                continue
+            if visited:
+                sizes[b] = 1 + sum(sizes[c] for c in children.get(b, []))
+            else:
+                stack.append((b, True))
+                stack.extend((c, False) for c in children.get(b, []) if c not in sizes)
+    return sizes
+
+def summarise(events, formulas, top=10):
+    '''Counts per rule, the most expanded formulas and the branches with the largest subtrees'''
+    rules = [e for e in events if e['e'] == 'rule']
+    name = lambda fid: formulas[fid] if fid < len(formulas) else '#%d' % fid
+    sizes = subtree_sizes(events)
+    by_branch = {e['b']: e for e in rules}
+    largest = sorted(((b, n) for b, n in sizes.items() if b in by_branch), key=lambda item: -item[1])[:top]
+    return {
+        'rule_applications': len(rules),
+        'closed_branches': sum(1 for e in events if e['e'] == 'close'),
+        'rules': dict(Counter(e['r'] for e in rules)),
+        'hot_formulas': [(name(fid), n) for fid, n in Counter(e['t'] for e in rules).most_common(top)],
+        'largest_subtrees': [(b, size, by_branch[b]['r'], name(by_branch[b]['t'])) for b, size in largest],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarise a tableau trace')
+    parser.add_argument('trace')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    summary = summarise(*load_trace(args.trace), top=args.top)
+    print('%d rule applications, %d closed branches' % (summary['rule_applications'], summary['closed_branches']))
+    for rule, n in sorted(summary['rules'].items(), key=lambda item: -item[1]):
+        print('  %-20s %d' % (rule, n))
+    print('Hot formulas:')
+    for fmla, n in summary['hot_formulas']:
+        print('  %6d  %s' % (n, fmla))
+    print('Largest subtrees:')
+    for b, size, rule, fmla in summary['largest_subtrees']:
+        print('  branch %-6d %6d branches  %s on %s' % (b, size, rule, fmla))
+
+if __name__ == '__main__':
+    main()